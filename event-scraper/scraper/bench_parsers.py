@@ -0,0 +1,102 @@
+# scraper/bench_parsers.py
+"""
+Parser micro-benchmark over a recorded fixture corpus (see fixtures.py).
+
+    SCRAPER_FIXTURES=record python -m scraper.main      # record a corpus once
+    python -m scraper.bench_parsers
+
+Pages are assigned to a site by url; a site's listing url is its listing page, every other
+page is a detail page. Error statuses are skipped.
+Reports pages/sec and peak Python memory (tracemalloc) per page for each parser backend.
+"""
+import argparse
+import time
+import tracemalloc
+
+from . import fetcher, parsers
+from .fixtures import FixtureStore
+
+SITES = {
+    "cityofsydney": {
+        "base_url": "https://whatson.cityofsydney.nsw.gov.au",
+        "listing_url": "https://whatson.cityofsydney.nsw.gov.au/",
+        "listing": parsers.cityofsydney_listing_urls,
+        "detail": parsers.parse_cityofsydney_event_detail,
+    },
+    "sydneycom": {
+        "base_url": "https://www.sydney.com",
+        "listing_url": "https://www.sydney.com/events",
+        "listing": parsers.sydneycom_listing_urls,
+        "detail": parsers.parse_sydneycom_event_detail,
+    },
+}
+
+
+def _classify(url):
+    """(site, kind) for a recorded url, or None if it belongs to no known site."""
+    for site, conf in SITES.items():
+        if url.startswith(conf["base_url"] + "/"):
+            return site, "listing" if url == conf["listing_url"] else "detail"
+    return None
+
+
+def _load(fixtures):
+    """{(site, kind): [(url, html), ...]} from a FixtureStore directory."""
+    pages = {}
+    for url, status, html in FixtureStore(fixtures).pages():
+        site_kind = _classify(url)
+        if site_kind is not None and status < 400:
+            pages.setdefault(site_kind, []).append((url, html))
+    return pages
+
+
+def _run(site, kind, url, html):
+    conf = SITES[site]
+    if kind == "listing":
+        return conf["listing"](html, conf["base_url"])
+    return conf["detail"](html, conf["base_url"], url)
+
+
+def bench(pages, backend, repeat):
+    parsers.HTML_PARSER = backend
+    rows = []
+    for (site, kind), saved in sorted(pages.items()):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for url, html in saved:
+                _run(site, kind, url, html)
+        elapsed = time.perf_counter() - started
+
+        peak = 0
+        for url, html in saved:
+            tracemalloc.start()
+            _run(site, kind, url, html)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        rows.append((site, kind, len(saved), repeat * len(saved) / elapsed, peak / 1e6))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parsers over saved pages.")
+    parser.add_argument("--fixtures", default=fetcher.FIXTURES_DIR, help="Corpus directory (contains index.json)")
+    parser.add_argument("--backends", default="html.parser,lxml", help="Comma-separated BeautifulSoup tree builders")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = _load(args.fixtures)
+    if not pages:
+        print(f"no fixtures in {args.fixtures}; record some with SCRAPER_FIXTURES=record")
+        return
+
+    print(f"{'backend':>12} {'site':>13} {'kind':>8} {'pages':>6} {'pages/s':>9} {'peak MB':>8}")
+    for backend in args.backends.split(","):
+        if backend == "lxml" and not parsers._HAVE_LXML:
+            print(f"{backend:>12} not installed (pip install lxml)")
+            continue
+        for site, kind, n, rate, peak_mb in bench(pages, backend, args.repeat):
+            print(f"{backend:>12} {site:>13} {kind:>8} {n:>6} {rate:>9.1f} {peak_mb:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
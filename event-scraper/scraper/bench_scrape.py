@@ -0,0 +1,110 @@
+# scraper/bench_scrape.py
+"""
+End-to-end scraper benchmark: run_once() over a recorded fixture corpus, against mongomock
+(or a throwaway database given with --mongo-uri, emptied first), with per-stage timings.
+
+    SCRAPER_FIXTURES=record python -m scraper.main      # record a corpus once
+    python -m scraper.bench_scrape --latency 0.2 --runs 2
+
+Sources run in this process (mongomock isn't shared across processes). The first run inserts
+everything; later runs skip the pages that aren't due or were just fetched (schedule.py),
+or with --no-schedule measure the unchanged path.
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from . import db, fetcher, parsers, schedule
+from . import main as runner
+from .fixtures import FixtureStore
+
+STAGES = ("fetch", "parse", "checksum", "upsert", "other")
+
+
+def _timed(timings, stage, fn):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[stage] += time.perf_counter() - started
+
+    return wrapper
+
+
+def _use_database(mongo_uri, db_name):
+    if mongo_uri:
+        from pymongo import MongoClient
+
+        database = MongoClient(mongo_uri)[db_name]
+        # start empty: a leftover schedule would make every page recently seen / not due
+        for name in ("events", "page_schedule", "cache_state"):
+            database[name].drop()
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("mongomock is not installed (pip install mongomock), or pass --mongo-uri")
+        database = mongomock.MongoClient()[db_name]
+    db.events_coll = runner.events_coll = database["events"]
+    db.cache_state_coll = database["cache_state"]
+    db.schedule_coll = schedule.schedule_coll = database["page_schedule"]
+    db._indexes_ensured = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run_once() over a recorded fixture corpus.")
+    parser.add_argument("--fixtures", default=fetcher.FIXTURES_DIR, help="Corpus directory (contains index.json)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Synthetic delay per fetch, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- fraction of the latency")
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--mongo-uri", help="Use this Mongo server instead of mongomock (its events, page_schedule and cache_state collections are dropped)")
+    parser.add_argument("--db", default="events_bench")
+    parser.add_argument("--no-schedule", action="store_true", help="Fetch every detail page on every run (SCRAPER_ADAPTIVE=0 SCRAPER_SEEN_TTL=0)")
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures, latency=args.latency, jitter=args.jitter)
+    if not store.urls():
+        raise SystemExit(f"no fixtures in {args.fixtures}; record some with SCRAPER_FIXTURES=record")
+    fetcher.FIXTURES_MODE = "replay"
+    fetcher.fixtures = store
+    # every run parses and writes, as on a cold cache
+    fetcher.http_cache = parsers.http_cache = None
+    runner.SOURCE_RETRIES = 0
+    if args.no_schedule:
+        runner.SCHEDULE_ENABLED = False
+        runner.SEEN_TTL = 0
+    _use_database(args.mongo_uri, args.db)
+
+    timings = dict.fromkeys(STAGES, 0.0)
+    for name in ("cityofsydney_listing_urls", "sydneycom_listing_urls",
+                 "parse_cityofsydney_event_detail", "parse_sydneycom_event_detail"):
+        setattr(parsers, name, _timed(timings, "parse", getattr(parsers, name)))
+    runner.make_checksum = _timed(timings, "checksum", runner.make_checksum)
+    runner.process_items = _timed(timings, "upsert", runner.process_items)
+
+    print(f"{len(store.urls())} pages in {args.fixtures}, latency {args.latency}s +/- {args.jitter:.0%}")
+    print(f"{'run':>3} {'total s':>8} " + " ".join(f"{s:>9}" for s in STAGES) + "  inserted/updated/unchanged/skipped")
+    for run in range(1, args.runs + 1):
+        for stage in timings:
+            timings[stage] = 0.0
+        started = time.perf_counter()
+        # run_once prints its whole stats dict
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = runner.run_once(workers=1)
+        total = time.perf_counter() - started
+
+        timings["fetch"] = stats["fetch_wall_time"]
+        # process_items includes building the docs, so its checksum share is reported separately
+        timings["upsert"] -= timings["checksum"]
+        timings["other"] = max(total - sum(timings[s] for s in STAGES if s != "other"), 0.0)
+        failed = f"  failed: {', '.join(stats['failed_sources'])}" if stats["failed_sources"] else ""
+        print(
+            f"{run:>3} {total:>8.3f} " + " ".join(f"{timings[s]:>9.3f}" for s in STAGES)
+            + f"  {stats['inserted']}/{stats['updated']}/{stats['unchanged']}/{stats['not_due'] + stats['recently_seen']}{failed}"
+        )
+
+
+if __name__ == "__main__":
+    main()
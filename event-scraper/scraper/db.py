@@ -1,9 +1,58 @@
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import OperationFailure, PyMongoError
 import os
 
+from .instrumentation import MongoCommandTimer
+
 MONGO_URI  = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = os.environ.get("MONGO_DB", "events_db")
 
-client = MongoClient(MONGO_URI)
+client = MongoClient(MONGO_URI, event_listeners=[MongoCommandTimer()])
 db = client[DB_NAME]
-events_coll = db["events"]
\ No newline at end of file
+events_coll = db["events"]
+# {_id: "events", generation: n}; the API keys its response cache on the generation
+cache_state_coll = db["cache_state"]
+# {_id: source_url, next_due_at, interval, ...}: when each detail page is fetched again (schedule.py)
+schedule_coll = db["page_schedule"]
+
+# Indexes the scraper's queries rely on.
+# Same names/options as events-api/events/indexes.py so either side can create them.
+EVENT_INDEXES = [
+    (
+        [("source_url", ASCENDING)],
+        {
+            "name": "source_url_unique",
+            "unique": True,
+            "partialFilterExpression": {"source_url": {"$type": "string"}},
+        },
+    ),
+    ([("checksum", ASCENDING)], {"name": "checksum"}),
+    ([("source_name", ASCENDING), ("last_scraped_at", ASCENDING)], {"name": "source_name_last_scraped_at"}),
+]
+
+_indexes_ensured = False
+
+def ensure_indexes():
+    """Create EVENT_INDEXES once per process (create_index is idempotent)."""
+    global _indexes_ensured
+    if _indexes_ensured:
+        return
+    for keys, options in EVENT_INDEXES:
+        try:
+            events_coll.create_index(keys, **options)
+        except OperationFailure as e:
+            # e.g. duplicate source_url values already stored; keep scraping without it
+            print("Could not create index", options["name"], e)
+        except PyMongoError as e:
+            # server unreachable: try again on the next run
+            print("Could not create indexes", e)
+            return
+    _indexes_ensured = True
+
+def bump_events_generation():
+    """Invalidate cached API responses (events-api/events/cache.py) after events changed."""
+    try:
+        cache_state_coll.update_one({"_id": "events"}, {"$inc": {"generation": 1}}, upsert=True)
+    except PyMongoError as e:
+        # cached responses then expire on their TTL instead
+        print("Could not bump events generation", e)
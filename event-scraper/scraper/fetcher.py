@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .fixtures import FixtureStore
+from .instrumentation import FETCH_SECONDS
+
+FETCH_WORKERS = int(os.environ.get("SCRAPER_FETCH_WORKERS", "8"))
+PER_HOST_LIMIT = int(os.environ.get("SCRAPER_PER_HOST_LIMIT", "4"))
+FETCH_DEADLINE = float(os.environ.get("SCRAPER_FETCH_DEADLINE", "60"))
+FETCH_TIMEOUT = 20
+USER_AGENT = "Mozilla/5.0 (compatible; EventScraper/1.0)"
+
+HTTP_CACHE_ENABLED = os.environ.get("SCRAPER_HTTP_CACHE", "1") == "1"
+HTTP_CACHE_DIR = os.environ.get("SCRAPER_HTTP_CACHE_DIR", os.path.join(os.getcwd(), ".http_cache"))
+
+# off | record | replay (see fixtures.py)
+FIXTURES_MODE = os.environ.get("SCRAPER_FIXTURES", "off")
+FIXTURES_DIR = os.path.join(
+    os.environ.get("SCRAPER_FIXTURES_DIR", os.path.join(os.getcwd(), "fixtures")),
+    os.environ.get("SCRAPER_FIXTURES_VERSION", "v1"),
+)
+
+
+# Shared session: keep-alive connections are reused across fetches and threads.
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=PER_HOST_LIMIT * 2, pool_maxsize=FETCH_WORKERS)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"})
+                _session = s
+    return _session
+
+
+class HttpCache:
+    """
+    On-disk cache of response bodies and their validators (ETag / Last-Modified), one JSON file per url.
+    Entries may also carry the parsed item (with the parser version that produced it)
+    so a 304 doesn't need re-parsing.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        tmp = "%s.%d.tmp" % (path, threading.get_ident())
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def set_parsed(self, url, parsed, version):
+        entry = self.get(url)
+        if entry is not None:
+            entry["parsed"] = parsed
+            entry["parsed_version"] = version
+            self.put(url, entry)
+
+
+http_cache = HttpCache(HTTP_CACHE_DIR) if HTTP_CACHE_ENABLED else None
+
+fixtures = None
+if FIXTURES_MODE in ("record", "replay"):
+    fixtures = FixtureStore(
+        FIXTURES_DIR,
+        latency=float(os.environ.get("SCRAPER_FIXTURES_LATENCY", "0")),
+        jitter=float(os.environ.get("SCRAPER_FIXTURES_JITTER", "0")),
+    )
+
+
+def fetch_page(url, timeout=FETCH_TIMEOUT, headers=None):
+    """
+    Conditional GET through the shared session and http cache.
+    Returns { html, status, cache, not_modified, parsed, parsed_version }:
+    cache is "hit" only when the cached body is served (304), "miss" otherwise, including
+    a revalidation that came back 200 with a new body;
+    on a 304 the cached body (and parsed item, if any, with the parser version that made it) is returned.
+    In fixture replay mode the page comes from the fixture corpus instead of the network.
+    """
+    if fixtures and FIXTURES_MODE == "replay":
+        return fixtures.replay(url)
+
+    req_headers = dict(headers or {})
+    # recording needs full bodies, not 304s
+    entry = http_cache.get(url) if http_cache and FIXTURES_MODE != "record" else None
+    if entry:
+        if entry.get("etag"):
+            req_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            req_headers["If-Modified-Since"] = entry["last_modified"]
+
+    resp = get_session().get(url, headers=req_headers, timeout=timeout)
+    if resp.status_code == 304 and entry:
+        return {
+            "html": entry.get("body"),
+            "status": 304,
+            "cache": "hit",
+            "not_modified": True,
+            "parsed": entry.get("parsed"),
+            "parsed_version": entry.get("parsed_version"),
+        }
+    if fixtures and FIXTURES_MODE == "record":
+        fixtures.record(url, resp.status_code, resp.headers, resp.text)
+    resp.raise_for_status()
+
+    html = resp.text
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if http_cache and (etag or last_modified):
+        http_cache.put(url, {"url": url, "etag": etag, "last_modified": last_modified, "body": html})
+    return {
+        "html": html,
+        "status": resp.status_code,
+        "cache": "miss",
+        "not_modified": False,
+        "parsed": None,
+        "parsed_version": None,
+    }
+
+
+def record_fetch(fetch_stats, result):
+    """Accumulate one fetch result (from fetch_many, or a single timed fetch_page) into fetch_stats."""
+    FETCH_SECONDS.observe(result["elapsed"], outcome="error" if result.get("error") else "ok")
+    if fetch_stats is None:
+        return
+    fetch_stats.setdefault("latencies", {})[result["url"]] = round(result["elapsed"], 3)
+    if result.get("error"):
+        fetch_stats["errors"] = fetch_stats.get("errors", 0) + 1
+        return
+    key = "cache_hits" if result.get("cache") == "hit" else "cache_misses"
+    fetch_stats[key] = fetch_stats.get(key, 0) + 1
+    if result.get("not_modified"):
+        fetch_stats["not_modified"] = fetch_stats.get("not_modified", 0) + 1
+
+
+class _HostLimiter:
+    """Hands out one semaphore per host so a single site never gets more than `limit` requests."""
+
+    def __init__(self, limit):
+        self.limit = max(int(limit), 1)
+        self._lock = threading.Lock()
+        self._sems = {}
+
+    def get(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.BoundedSemaphore(self.limit)
+            return sem
+
+
+def fetch_many(urls, fetch=fetch_page, max_workers=None, per_host=None, deadline=None, timeout=FETCH_TIMEOUT):
+    """
+    Fetch `urls` in parallel with `fetch(url, timeout=...)`, which returns a page dict (see fetch_page).
+    Returns one dict per url, in input order:
+    { url, html, error, elapsed, ...page fields }
+    Requests still pending when `deadline` seconds have passed are reported as errors.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+
+    max_workers = max_workers or FETCH_WORKERS
+    deadline = FETCH_DEADLINE if deadline is None else deadline
+    limiter = _HostLimiter(per_host or PER_HOST_LIMIT)
+    deadline_at = time.monotonic() + deadline
+
+    def _one(url):
+        with limiter.get(url):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                return {"url": url, "html": None, "error": "deadline exceeded", "elapsed": 0.0}
+            started = time.monotonic()
+            try:
+                page = fetch(url, timeout=min(timeout, remaining))
+                return {**page, "url": url, "error": None, "elapsed": time.monotonic() - started}
+            except Exception as e:
+                return {"url": url, "html": None, "error": str(e), "elapsed": time.monotonic() - started}
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)))
+    try:
+        futures = [pool.submit(_one, url) for url in urls]
+        wait(futures, timeout=max(deadline_at - time.monotonic(), 0))
+    finally:
+        # don't block on stragglers; their own timeout is capped by the deadline
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for url, fut in zip(urls, futures):
+        if fut.done() and not fut.cancelled():
+            results.append(fut.result())
+        else:
+            results.append({"url": url, "html": None, "error": "deadline exceeded", "elapsed": deadline})
+    return results
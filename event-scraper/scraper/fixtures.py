@@ -0,0 +1,99 @@
+# scraper/fixtures.py
+"""
+Record/replay of fetched pages, for reproducible scraper runs and benchmarks.
+
+A corpus lives in <SCRAPER_FIXTURES_DIR>/<SCRAPER_FIXTURES_VERSION>/:
+    index.json    {"format": 1, "pages": {url: {file, status, headers, recorded_at}}}
+    pages/        one file per url (sha256 of the url)
+
+SCRAPER_FIXTURES=record fetches live and saves every page (error statuses included);
+SCRAPER_FIXTURES=replay serves the saved pages instead of the network, after a synthetic
+delay of SCRAPER_FIXTURES_LATENCY seconds (+/- SCRAPER_FIXTURES_JITTER, a fraction).
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+
+FIXTURE_FORMAT = 1
+# response headers kept in the index
+KEEP_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class FixtureMissing(Exception):
+    pass
+
+
+class FixtureStore:
+    def __init__(self, directory, latency=0.0, jitter=0.0):
+        self.directory = directory
+        self.latency = latency
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._index = None
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _load(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except OSError:
+                index = {"format": FIXTURE_FORMAT, "pages": {}}
+            if index.get("format") != FIXTURE_FORMAT:
+                raise ValueError(f"{self.index_path}: fixture format {index.get('format')}, expected {FIXTURE_FORMAT}")
+            self._index = index
+        return self._index
+
+    def urls(self):
+        with self._lock:
+            return list(self._load()["pages"])
+
+    def pages(self):
+        """(url, status, html) for every recorded page, in url order."""
+        with self._lock:
+            entries = dict(self._load()["pages"])
+        for url in sorted(entries):
+            with open(os.path.join(self.directory, entries[url]["file"]), "r", encoding="utf-8", errors="replace") as f:
+                yield url, entries[url]["status"], f.read()
+
+    def record(self, url, status, headers, body):
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest() + ".html"
+        pages_dir = os.path.join(self.directory, "pages")
+        os.makedirs(pages_dir, exist_ok=True)
+        with open(os.path.join(pages_dir, name), "w", encoding="utf-8") as f:
+            f.write(body or "")
+        with self._lock:
+            index = self._load()
+            index["pages"][url] = {
+                "file": "pages/" + name,
+                "status": status,
+                "headers": {k: headers[k] for k in KEEP_HEADERS if k in headers},
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            }
+            tmp = "%s.%d.tmp" % (self.index_path, threading.get_ident())
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.index_path)
+
+    def replay(self, url):
+        """A fetch_page() result for url; raises like a failed request for missing pages and error statuses."""
+        with self._lock:
+            entry = self._load()["pages"].get(url)
+        delay = self.latency * (1 + random.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            time.sleep(delay)
+        if entry is None:
+            raise FixtureMissing(f"no fixture for {url}")
+        if entry["status"] >= 400:
+            raise requests.HTTPError(f"{entry['status']} (replayed) for url: {url}")
+        with open(os.path.join(self.directory, entry["file"]), "r", encoding="utf-8") as f:
+            html = f.read()
+        return {"html": html, "status": entry["status"], "cache": "miss", "not_modified": False, "parsed": None}
@@ -0,0 +1,169 @@
+# scraper/instrumentation.py
+"""
+Lightweight timers/histograms shared by the scraper and events-api (which imports this
+module from the monorepo, like events/tasks.py imports the scraper). Stdlib only.
+
+- Histograms are process-local and rendered in the Prometheus text format by render().
+- collect() additionally gathers the observations made in the current context
+  (thread / task) into a per-run summary, e.g. one scrape of one source.
+- MongoCommandTimer times every Mongo round trip through pymongo's command monitoring.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_registry = {}
+_collector = contextvars.ContextVar("instrumentation_collector", default=None)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # labels (sorted tuple of pairs) -> [bucket counts..., sum, count]
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+        run = _collector.get()
+        if run is not None:
+            run.add(self.name, value)
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_labels(key, le=repr(bound))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(key)} {values[-2]!r}")
+            lines.append(f"{self.name}_count{_labels(key)} {values[-1]}")
+        return lines
+
+
+def _labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def histogram(name, help, buckets=BUCKETS):
+    """The histogram registered under name, created on first use."""
+    with _lock:
+        hist = _registry.get(name)
+        if hist is None:
+            hist = _registry[name] = Histogram(name, help, buckets)
+        return hist
+
+
+def render():
+    """All registered histograms in the Prometheus text exposition format."""
+    with _lock:
+        hists = sorted(_registry.values(), key=lambda h: h.name)
+    lines = []
+    for hist in hists:
+        lines.extend(hist.render())
+    return "\n".join(lines) + "\n"
+
+
+class RunTimings:
+    """Per-metric count / total / max of the observations made inside one collect() block."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def add(self, name, value):
+        with self._lock:
+            t = self._totals.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            t["count"] += 1
+            t["sum"] += value
+            t["max"] = max(t["max"], value)
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {"count": t["count"], "sum": round(t["sum"], 4), "max": round(t["max"], 4)}
+                for name, t in self._totals.items()
+            }
+
+
+@contextlib.contextmanager
+def collect():
+    """Collect the observations made in this context (not in threads it starts) into a RunTimings."""
+    run = RunTimings()
+    token = _collector.set(run)
+    try:
+        yield run
+    finally:
+        _collector.reset(token)
+
+
+def merge_summaries(summaries):
+    """Combine RunTimings.summary() dicts (e.g. one per source) into one."""
+    merged = {}
+    for summary in summaries:
+        for name, t in (summary or {}).items():
+            m = merged.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            m["count"] += t["count"]
+            m["sum"] = round(m["sum"] + t["sum"], 4)
+            m["max"] = max(m["max"], t["max"])
+    return merged
+
+
+FETCH_SECONDS = histogram("scraper_fetch_seconds", "Page fetch latency (including synthetic fixture latency).")
+PARSE_SECONDS = histogram("scraper_parse_seconds", "HTML parse time per page.")
+MONGO_SECONDS = histogram("mongo_command_seconds", "Mongo round trip time per command.")
+EMBED_SECONDS = histogram("recommender_embed_seconds", "Model encode time per batch of texts.")
+SEARCH_SECONDS = histogram("recommender_search_seconds", "Vector index search time per batch of queries.")
+REQUEST_SECONDS = histogram("http_request_seconds", "API request handling time.")
+
+
+try:
+    from pymongo import monitoring
+
+    class MongoCommandTimer(monitoring.CommandListener):
+        """
+        Observes MONGO_SECONDS for every command; pass to MongoClient(event_listeners=[...]).
+        Events are delivered on the thread that ran the command, so collect() sees them too.
+        """
+
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            MONGO_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+        def failed(self, event):
+            MONGO_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+except ImportError:
+    MongoCommandTimer = None
@@ -1,13 +1,28 @@
 # scraper/main.py
+import multiprocessing
+import os
+import time
+from multiprocessing.pool import ThreadPool
 from datetime import datetime, timedelta
 
+from pymongo import InsertOne, UpdateMany, UpdateOne
+
+try:
+    # raised inside Celery tasks when their soft time limit fires
+    from celery.exceptions import SoftTimeLimitExceeded
+except ImportError:
+    class SoftTimeLimitExceeded(Exception):
+        pass
+
+from .fetcher import fetch_page, record_fetch
+from .instrumentation import collect, merge_summaries
 from .parsers import (
-    fetch_url,
     parse_cityofsydney_whats_on_listing,
     parse_sydneycom_events_listing,
 )
-from .db import events_coll
-from .utils import make_checksum, now_iso
+from .db import bump_events_generation, ensure_indexes, events_coll
+from .schedule import SCHEDULE_ENABLED, SEEN_TTL, record_results, split_urls
+from .utils import make_checksum, now_utc, to_bson_datetime
 
 SOURCES = [
     {
@@ -24,7 +39,7 @@ SOURCES = [
     },
 ]
 
-def process_item(item, source_name):
+def _build_doc(item, source_name):
     # normalize
     title = item.get("title")
     start_time = item.get("start_time")
@@ -36,18 +51,9 @@ def process_item(item, source_name):
 
     checksum = make_checksum(title, str(start_time), venue, description, city, str(tags))
 
-    query = {}
-    if source_url:
-        query = {"source_url": source_url}
-    else:
-        # fallback: by checksum if no source_url
-        query = {"checksum": checksum}
-
-    existing = events_coll.find_one(query)
-
-    doc = {
+    return {
         "title": title,
-        "start_time": start_time.isoformat() if start_time else None,
+        "start_time": to_bson_datetime(start_time),
         "venue": venue,
         "city": city,
         "description": description,
@@ -55,51 +61,269 @@ def process_item(item, source_name):
         "image_url": item.get("image_url"),
         "source_url": source_url,
         "source_name": source_name,
-        "last_scraped_at": now_iso(),
+        "last_scraped_at": now_utc(),
         "checksum": checksum
     }
 
-    if not existing:
-        doc.update({"status": "new", "created_at": now_iso()})
-        events_coll.insert_one(doc)
-        return "inserted"
-    else:
-        # If checksum changed -> updated
-        if existing.get("checksum") != checksum:
-            doc.update({"status": "updated", "created_at": existing.get("created_at")})
-            events_coll.update_one({"_id": existing["_id"]}, {"$set": doc})
-            return "updated"
+
+def process_items(items, source_name):
+    """
+    Upsert a batch of items from one source.
+    Existing checksums are prefetched with a single $in query, the inserted/updated/unchanged
+    split is computed in memory and all writes go out in one unordered bulk_write.
+    Returns "inserted" / "updated" / "unchanged" per item, same as process_item would.
+    """
+    docs = [_build_doc(it, source_name) for it in items]
+    if not docs:
+        return []
+
+    # match by source_url; fallback: by checksum if no source_url
+    urls = [d["source_url"] for d in docs if d["source_url"]]
+    checksums = [d["checksum"] for d in docs if not d["source_url"]]
+    clauses = []
+    if urls:
+        clauses.append({"source_url": {"$in": urls}})
+    if checksums:
+        clauses.append({"checksum": {"$in": checksums}})
+    by_url, by_checksum = {}, {}
+    for e in events_coll.find({"$or": clauses}, {"source_url": 1, "checksum": 1, "created_at": 1}):
+        if e.get("source_url"):
+            by_url.setdefault(e["source_url"], e)
+        by_checksum.setdefault(e.get("checksum"), e)
+
+    # key -> state after applying the items seen so far; repeated keys within the batch
+    # are folded together so the result doesn't depend on bulk_write ordering.
+    pending = {}
+    results = []
+    now = now_utc()
+    for doc in docs:
+        key = ("source_url", doc["source_url"]) if doc["source_url"] else ("checksum", doc["checksum"])
+        cur = pending.get(key)
+        if cur is None:
+            found = by_url.get(doc["source_url"]) if doc["source_url"] else by_checksum.get(doc["checksum"])
+            if found:
+                cur = {"_id": found["_id"], "checksum": found.get("checksum"), "created_at": found.get("created_at"), "set": None}
+
+        if cur is None:
+            doc.update({"status": "new", "created_at": now})
+            pending[key] = {"_id": None, "checksum": doc["checksum"], "created_at": now, "set": doc}
+            results.append("inserted")
+        elif cur["checksum"] != doc["checksum"]:
+            # If checksum changed -> updated
+            doc.update({"status": "updated", "created_at": cur["created_at"]})
+            pending[key] = {**cur, "checksum": doc["checksum"], "set": doc}
+            results.append("updated")
         else:
             # unchanged, just update last_scraped_at
-            events_coll.update_one({"_id": existing["_id"]}, {"$set": {"last_scraped_at": now_iso()}})
-            return "unchanged"
+            if cur["set"] is not None:
+                cur["set"]["last_scraped_at"] = now
+            pending[key] = cur
+            results.append("unchanged")
 
+    ops = []
+    touched = []
+    for state in pending.values():
+        if state["_id"] is None:
+            ops.append(InsertOne(state["set"]))
+        elif state["set"] is not None:
+            ops.append(UpdateOne({"_id": state["_id"]}, {"$set": state["set"]}))
+        else:
+            touched.append(state["_id"])
+    if touched:
+        ops.append(UpdateMany({"_id": {"$in": touched}}, {"$set": {"last_scraped_at": now}}))
+    events_coll.bulk_write(ops, ordered=False)
+    return results
+
+
+def process_item(item, source_name):
+    return process_items([item], source_name)[0]
 
-def run_once():
-    stats = {"inserted":0,"updated":0,"unchanged":0}
-    for src in SOURCES:
+
+# Sources are scraped in parallel, each in its own process with its own timeout/retries
+# (a source dict may override "timeout" / "retries").
+SOURCE_WORKERS = int(os.environ.get("SCRAPER_SOURCE_WORKERS", "4"))
+SOURCE_TIMEOUT = float(os.environ.get("SCRAPER_SOURCE_TIMEOUT", "600"))
+SOURCE_RETRIES = int(os.environ.get("SCRAPER_SOURCE_RETRIES", "2"))
+SOURCE_RETRY_BACKOFF = float(os.environ.get("SCRAPER_SOURCE_RETRY_BACKOFF", "5"))
+INACTIVE_AFTER_DAYS = 7
+
+def _new_fetch_stats():
+    return {
+        "wall_time": 0.0,
+        "latencies": {},
+        "errors": 0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "not_modified": 0,
+    }
+
+def _detail_url_filter(stats):
+    """
+    Listing short-circuit: only detail pages that are new, due (schedule.py) and not fetched
+    within SEEN_TTL are fetched. Events of the skipped pages are still listed, so their
+    last_scraped_at is refreshed (one update_many) and they don't get marked inactive.
+    """
+    def url_filter(urls):
+        now = now_utc()
+        fetch, recently_seen, not_due = split_urls(urls, now)
+        stats["recently_seen"] += len(recently_seen)
+        stats["not_due"] += len(not_due)
+        skipped = recently_seen + not_due
+        if skipped:
+            events_coll.update_many({"source_url": {"$in": skipped}}, {"$set": {"last_scraped_at": now}})
+        return fetch
+    return url_filter
+
+class SourceTimeout(Exception):
+    pass
+
+def _scrape_source_once(src, stats, fetch_stats, deadline):
+    started = time.monotonic()
+    page = fetch_page(src["url"])
+    elapsed = time.monotonic() - started
+    fetch_stats["wall_time"] += elapsed
+    record_fetch(fetch_stats, {**page, "url": src["url"], "elapsed": elapsed})
+    short_circuit = SCHEDULE_ENABLED or SEEN_TTL > 0
+    url_filter = _detail_url_filter(stats) if short_circuit else None
+    items = src["parser"](page["html"], src["base_url"], fetch_stats=fetch_stats, url_filter=url_filter)
+    if time.time() > deadline:
+        # past the source's timeout: run_once has given up on it, so don't write anything
+        raise SourceTimeout("timed out (deadline passed before writing)")
+    results = process_items(items, src["name"])
+    for res in results:
+        stats[res] += 1
+    if short_circuit:
+        record_results(items, results)
+    # after scraping items for a source: mark older events as inactive
+    cutoff = datetime.utcnow() - timedelta(days=INACTIVE_AFTER_DAYS)
+    res = events_coll.update_many(
+        {
+            "source_name": src["name"],
+            "last_scraped_at": {"$lt": cutoff},
+            "status": {"$ne": "imported"},
+        },
+        {"$set": {"status": "inactive"}},
+    )
+    stats["marked_inactive"] += res.modified_count
+
+def scrape_source(name, deadline=None):
+    """
+    Scrape one source (by name), retrying failed attempts with backoff until `deadline`
+    (epoch seconds; default: the source's timeout from now). Past the deadline no retry is
+    started and a running attempt stops before writing to Mongo.
+    Returns the source's stats with status "ok" or "error"; only a Celery soft time limit
+    is raised, so the calling task can report it.
+    """
+    src = next((s for s in SOURCES if s["name"] == name), None)
+    if src is None:
+        return {"status": "error", "error": f"unknown source {name}"}
+    ensure_indexes()
+    started = time.monotonic()
+    if deadline is None:
+        deadline = time.time() + src.get("timeout", SOURCE_TIMEOUT)
+    retries = src.get("retries", SOURCE_RETRIES)
+    # fetch / parse / Mongo timings of all attempts
+    with collect() as timings:
+        for attempt in range(1, retries + 2):
+            stats = {"inserted":0,"updated":0,"unchanged":0,"marked_inactive":0,"not_due":0,"recently_seen":0}
+            fetch_stats = _new_fetch_stats()
+            try:
+                _scrape_source_once(src, stats, fetch_stats, deadline)
+                stats["status"] = "ok"
+                break
+            except SoftTimeLimitExceeded:
+                raise
+            except SourceTimeout as e:
+                print("Timed out scraping", name, f"(attempt {attempt})")
+                stats.update({"status": "error", "error": str(e)})
+                break
+            except Exception as e:
+                print("Error scraping", name, f"(attempt {attempt}):", e)
+                stats.update({"status": "error", "error": str(e)})
+                backoff = SOURCE_RETRY_BACKOFF * attempt
+                if attempt > retries or time.time() + backoff >= deadline:
+                    break
+                time.sleep(backoff)
+    stats["attempts"] = attempt
+    stats["elapsed"] = round(time.monotonic() - started, 3)
+    stats["timings"] = timings.summary()
+    stats["fetch"] = fetch_stats
+    return stats
+
+def merge_source_stats(results):
+    """
+    Combine {source_name: scrape_source() result} into run_once's summary;
+    per-source details stay under "sources", "timings" sums their per-stage timings.
+    """
+    stats = {"inserted":0,"updated":0,"unchanged":0,"marked_inactive":0,"not_due":0,"recently_seen":0}
+    fetch_stats = _new_fetch_stats()
+    for res in results.values():
+        for key in stats:
+            stats[key] += res.get(key, 0)
+        fetch = res.get("fetch") or {}
+        fetch_stats["wall_time"] += fetch.get("wall_time", 0.0)
+        fetch_stats["latencies"].update(fetch.get("latencies", {}))
+        for key in ("errors", "cache_hits", "cache_misses", "not_modified"):
+            fetch_stats[key] += fetch.get(key, 0)
+    if any(stats.values()):
+        # unchanged and skipped items still get a new last_scraped_at
+        bump_events_generation()
+    stats["fetch_wall_time"] = round(fetch_stats["wall_time"], 3)
+    stats["fetch_errors"] = fetch_stats["errors"]
+    stats["http_cache_hits"] = fetch_stats["cache_hits"]
+    stats["http_cache_misses"] = fetch_stats["cache_misses"]
+    stats["http_not_modified"] = fetch_stats["not_modified"]
+    stats["fetch_latencies"] = fetch_stats["latencies"]
+    stats["timings"] = merge_summaries(res.get("timings") for res in results.values())
+    stats["failed_sources"] = [name for name, res in results.items() if res.get("status") != "ok"]
+    stats["sources"] = {
+        name: {k: v for k, v in res.items() if k != "fetch"} for name, res in results.items()
+    }
+    return stats
+
+def _source_pool(size):
+    # Celery's prefork workers are daemonic and can't start child processes; use threads there
+    if multiprocessing.current_process().daemon:
+        return ThreadPool(size)
+    # spawn: children get their own Mongo client and HTTP session instead of forked copies
+    return multiprocessing.get_context("spawn").Pool(size)
+
+def run_once(workers=None):
+    started = time.monotonic()
+    ensure_indexes()
+    names = [src["name"] for src in SOURCES]
+    workers = min(workers or SOURCE_WORKERS, len(names))
+    results = {}
+    if workers <= 1:
+        for name in names:
+            results[name] = scrape_source(name)
+    else:
+        pool = _source_pool(workers)
+        started_at = time.time()
         try:
-            html = fetch_url(src["url"])
-            items = src["parser"](html, src["base_url"])
-            seen_urls = set()
-            for it in items:
-                res = process_item(it, src["name"])
-                stats[res] += 1
-                if it.get("source_url"):
-                    seen_urls.add(it.get("source_url"))
-            # after scraping items for a source: mark older events as inactive
-            threshold_days = 7
-            cutoff = datetime.utcnow() - timedelta(days=threshold_days)
-            events_coll.update_many(
-                {
-                    "source_name": src["name"],
-                    "last_scraped_at": {"$lt": cutoff.isoformat() + "Z"},
-                    "status": {"$ne": "imported"},
-                },
-                {"$set": {"status": "inactive"}},
-            )
-        except Exception as e:
-            print("Error scraping", src["name"], e)
+            # same deadlines as the waits below, also for sources queued behind others
+            pending = {
+                src["name"]: pool.apply_async(scrape_source, (src["name"], started_at + src.get("timeout", SOURCE_TIMEOUT)))
+                for src in SOURCES
+            }
+            for src in SOURCES:
+                # each source's own timeout, counted from the start of the run
+                timeout = src.get("timeout", SOURCE_TIMEOUT)
+                remaining = max(0.0, timeout - (time.monotonic() - started))
+                try:
+                    results[src["name"]] = pending[src["name"]].get(remaining)
+                except multiprocessing.TimeoutError:
+                    print("Timed out scraping", src["name"])
+                    results[src["name"]] = {"status": "error", "error": f"timed out after {timeout}s"}
+                except Exception as e:
+                    results[src["name"]] = {"status": "error", "error": str(e)}
+        finally:
+            # kills worker processes still running past their timeout. ThreadPool threads (inside
+            # Celery workers) can't be killed: they run on, but scrape_source stops at its deadline
+            # without writing, so a timed-out source doesn't touch Mongo after being reported
+            pool.terminate()
+    stats = merge_source_stats(results)
+    stats["wall_time"] = round(time.monotonic() - started, 3)
     print("Done. stats:", stats)
     return stats
 
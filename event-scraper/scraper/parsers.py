@@ -1,20 +1,52 @@
+import hashlib
+import os
 import re
+import time
+from datetime import datetime
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-import requests
+from bs4 import BeautifulSoup, Comment, SoupStrainer
+from .fetcher import fetch_many, fetch_page, http_cache, record_fetch
+from .instrumentation import PARSE_SECONDS
 from .utils import parse_datetime
 
+try:
+    import lxml  # noqa: F401
+    _HAVE_LXML = True
+except ImportError:
+    _HAVE_LXML = False
+
+# BeautifulSoup tree builder: auto (lxml when installed, else html.parser), lxml, html.parser
+HTML_PARSER = os.environ.get("SCRAPER_HTML_PARSER", "auto")
+# Listing pages only need the links
+_LINKS_ONLY = SoupStrainer("a", href=True)
+# Strings after a label/heading searched by the date regexes before falling back to the whole page
+DATE_REGION_STRINGS = 40
+
+
+def html_parser_name():
+    if HTML_PARSER == "auto":
+        return "lxml" if _HAVE_LXML else "html.parser"
+    return HTML_PARSER
+
+
+# Parsed items cached with HTTP entries are only reused by the same parser code (this module
+# and utils.py, which holds parse_datetime) with the same tree builder; any edit invalidates them.
+_PARSER_SOURCE_HASH = hashlib.sha256(
+    b"".join(open(os.path.join(os.path.dirname(__file__), name), "rb").read() for name in ("parsers.py", "utils.py"))
+).hexdigest()[:16]
+
+
+def parser_version():
+    return f"{_PARSER_SOURCE_HASH}:{html_parser_name()}"
+
+
+def _soup(html, parse_only=None):
+    return BeautifulSoup(html, html_parser_name(), parse_only=parse_only)
+
 
 def fetch_url(url, timeout=20, headers=None):
-    default_headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; EventScraper/1.0)"
-    }
-    if headers:
-        default_headers.update(headers)
-    resp = requests.get(url, headers=default_headers, timeout=timeout)
-    resp.raise_for_status()
-    return resp.text
+    return fetch_page(url, timeout=timeout, headers=headers)["html"]
 
 
 def _first_text(tag):
@@ -30,10 +62,37 @@ def _abs_url(base_url: str, href: str | None) -> str | None:
     return urljoin(base_url.rstrip("/") + "/", href)
 
 
+def _find_heading(soup: BeautifulSoup, text: str):
+    # filter on the tag name first; only h2/h3 get their text extracted
+    for h in soup.find_all(["h2", "h3"]):
+        if h.get_text(strip=True).lower() == text:
+            return h
+    return None
+
+
+def _text_after(node, limit=DATE_REGION_STRINGS) -> str:
+    """Text of node and the next `limit` visible strings: a bounded region for the date regexes."""
+    parts = [node.get_text("\n", strip=True) if hasattr(node, "get_text") else str(node).strip()]
+    for s in node.find_all_next(string=True, limit=limit):
+        if isinstance(s, Comment) or s.parent.name in {"script", "style"}:
+            continue
+        s = s.strip()
+        if s:
+            parts.append(s)
+    return "\n".join(parts)
+
+
+def _search_near(pattern, soup: BeautifulSoup, anchor):
+    """Regex search in the region after anchor; the whole page text only if that finds nothing."""
+    if anchor is not None:
+        m = re.search(pattern, _text_after(anchor))
+        if m:
+            return m
+    return re.search(pattern, soup.get_text("\n", strip=True))
+
+
 def _extract_overview_text(soup: BeautifulSoup) -> str | None:
-    overview_heading = soup.find(
-        lambda t: t.name in {"h2", "h3"} and t.get_text(strip=True).lower() == "overview"
-    )
+    overview_heading = _find_heading(soup, "overview")
     if not overview_heading:
         return None
 
@@ -68,6 +127,52 @@ def _extract_first_image_url(soup: BeautifulSoup, prefer_contains: str | None =
     return None
 
 
+def _fetch_details(urls, parse_detail, base_url, fetch_stats=None):
+    """
+    Fetch detail pages concurrently and parse them in listing order.
+    If `fetch_stats` is given, fetch wall time and per-url latencies are added to it.
+    """
+    started = time.monotonic()
+    results = fetch_many(urls)
+    if fetch_stats is not None:
+        fetch_stats["wall_time"] = fetch_stats.get("wall_time", 0.0) + (time.monotonic() - started)
+    for r in results:
+        record_fetch(fetch_stats, r)
+
+    items = []
+    for r in results:
+        if r["html"] is None:
+            # Skip bad pages but keep overall scrape going.
+            continue
+        # 304 with a parsed copy from the current parser code: nothing to re-parse
+        if r.get("not_modified") and r.get("parsed") and r.get("parsed_version") == parser_version():
+            items.append(_item_from_cache(r["parsed"]))
+            continue
+        try:
+            with PARSE_SECONDS.time(page="detail"):
+                item = parse_detail(r["html"], base_url, r["url"])
+        except Exception:
+            continue
+        if http_cache:
+            http_cache.set_parsed(r["url"], _item_to_cache(item), parser_version())
+        items.append(item)
+    return items
+
+
+def _item_to_cache(item: dict) -> dict:
+    d = dict(item)
+    if isinstance(d.get("start_time"), datetime):
+        d["start_time"] = d["start_time"].isoformat()
+    return d
+
+
+def _item_from_cache(d: dict) -> dict:
+    item = dict(d)
+    if item.get("start_time"):
+        item["start_time"] = datetime.fromisoformat(item["start_time"])
+    return item
+
+
 def _parse_date_range_start(text: str | None):
     if not text:
         return None
@@ -78,12 +183,11 @@ def _parse_date_range_start(text: str | None):
 
 
 def parse_cityofsydney_event_detail(html: str, base_url: str, source_url: str) -> dict:
-    soup = BeautifulSoup(html, "html.parser")
+    soup = _soup(html)
 
     title = _first_text(soup.find("h1"))
 
-    # Heuristic: the page text contains a clear "Where" and "When" block.
-    page_text = soup.get_text("\n", strip=True)
+    # Heuristic: the page contains a clear "Where" and "When" block.
     venue = None
     start_time = None
 
@@ -94,15 +198,25 @@ def parse_cityofsydney_event_detail(html: str, base_url: str, source_url: str) -
         venue_link = container.find_next("a") if container else None
         venue = _first_text(venue_link)
 
-    # When: grab the date range line if present.
-    m = re.search(r"\b([A-Za-z]+\s+\d{1,2}\s+[A-Za-z]+\s+\d{4})\s+to\s+([A-Za-z]+\s+\d{1,2}\s+[A-Za-z]+\s+\d{4})\b", page_text)
+    # When: grab the date range line if present, looking right after the "When" label first.
+    when_label = soup.find(string=lambda s: isinstance(s, str) and s.strip() == "When")
+    m = _search_near(
+        r"\b([A-Za-z]+\s+\d{1,2}\s+[A-Za-z]+\s+\d{4})\s+to\s+([A-Za-z]+\s+\d{1,2}\s+[A-Za-z]+\s+\d{4})\b",
+        soup,
+        when_label,
+    )
     if m:
         start_time = parse_datetime(m.group(1))
 
     description = None
     # The main content paragraphs usually appear after "Cost"; fall back to first few paragraphs.
-    paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
-    paragraphs = [p for p in paragraphs if p]
+    paragraphs = []
+    for p in soup.find_all("p"):
+        txt = p.get_text(" ", strip=True)
+        if txt:
+            paragraphs.append(txt)
+            if len(paragraphs) == 3:
+                break
     if paragraphs:
         description = "\n\n".join(paragraphs[:3]).strip() or None
 
@@ -118,8 +232,16 @@ def parse_cityofsydney_event_detail(html: str, base_url: str, source_url: str) -
     }
 
 
-def parse_cityofsydney_whats_on_listing(html: str, base_url: str, max_items: int = 20):
-    soup = BeautifulSoup(html, "html.parser")
+def parse_cityofsydney_whats_on_listing(html: str, base_url: str, max_items: int = 20, fetch_stats=None, url_filter=None):
+    with PARSE_SECONDS.time(page="listing"):
+        urls = cityofsydney_listing_urls(html, base_url, max_items)
+    if url_filter is not None:
+        urls = url_filter(urls)
+    return _fetch_details(urls, parse_cityofsydney_event_detail, base_url, fetch_stats)
+
+
+def cityofsydney_listing_urls(html: str, base_url: str, max_items: int = 20) -> list[str]:
+    soup = _soup(html, parse_only=_LINKS_ONLY)
 
     # Collect distinct event detail URLs.
     urls: list[str] = []
@@ -132,39 +254,28 @@ def parse_cityofsydney_whats_on_listing(html: str, base_url: str, max_items: int
             urls.append(full)
         if len(urls) >= max_items:
             break
-
-    items = []
-    for url in urls:
-        try:
-            detail_html = fetch_url(url)
-            items.append(parse_cityofsydney_event_detail(detail_html, base_url, url))
-        except Exception:
-            # Skip bad pages but keep overall scrape going.
-            continue
-    return items
+    return urls
 
 
 def parse_sydneycom_event_detail(html: str, base_url: str, source_url: str) -> dict:
-    soup = BeautifulSoup(html, "html.parser")
-    title = _first_text(soup.find("h1"))
+    soup = _soup(html)
+    h1 = soup.find("h1")
+    title = _first_text(h1)
     overview = _extract_overview_text(soup)
 
-    page_text = soup.get_text("\n", strip=True)
-
-    # Date range on detail pages looks like: Fri 06 Feb '26 – Sat 28 Feb '26
+    # Date range on detail pages looks like: Fri 06 Feb '26 – Sat 28 Feb '26 (shown near the title)
     start_time = None
-    m = re.search(
+    m = _search_near(
         r"\b([A-Za-z]{3}\s+\d{2}\s+[A-Za-z]{3}\s+'\d{2})\s*[–-]\s*([A-Za-z]{3}\s+\d{2}\s+[A-Za-z]{3}\s+'\d{2})\b",
-        page_text,
+        soup,
+        h1,
     )
     if m:
         start_time = parse_datetime(m.group(1))
 
     # Venue/address: try to use the "Location" section.
     venue = None
-    loc_heading = soup.find(
-        lambda t: t.name in {"h2", "h3"} and t.get_text(strip=True).lower() == "location"
-    )
+    loc_heading = _find_heading(soup, "location")
     if loc_heading:
         # First non-empty line after the heading.
         for sib in loc_heading.find_all_next():
@@ -189,8 +300,16 @@ def parse_sydneycom_event_detail(html: str, base_url: str, source_url: str) -> d
     }
 
 
-def parse_sydneycom_events_listing(html: str, base_url: str, max_items: int = 20):
-    soup = BeautifulSoup(html, "html.parser")
+def parse_sydneycom_events_listing(html: str, base_url: str, max_items: int = 20, fetch_stats=None, url_filter=None):
+    with PARSE_SECONDS.time(page="listing"):
+        urls = sydneycom_listing_urls(html, base_url, max_items)
+    if url_filter is not None:
+        urls = url_filter(urls)
+    return _fetch_details(urls, parse_sydneycom_event_detail, base_url, fetch_stats)
+
+
+def sydneycom_listing_urls(html: str, base_url: str, max_items: int = 20) -> list[str]:
+    soup = _soup(html, parse_only=_LINKS_ONLY)
 
     urls: list[str] = []
     for a in soup.find_all("a", href=True):
@@ -212,15 +331,7 @@ def parse_sydneycom_events_listing(html: str, base_url: str, max_items: int = 20
             urls.append(full)
         if len(urls) >= max_items:
             break
-
-    items = []
-    for url in urls:
-        try:
-            detail_html = fetch_url(url)
-            items.append(parse_sydneycom_event_detail(detail_html, base_url, url))
-        except Exception:
-            continue
-    return items
+    return urls
 
 def parse_generic_event_page(html, base_url):
     """
@@ -228,7 +339,7 @@ def parse_generic_event_page(html, base_url):
     { title, start_time, venv, description, image_url, source_url}
     You must adapt the CSS selector per site
     """
-    soup = BeautifulSoup(html, "html.parser")
+    soup = _soup(html)
     items = []
     for card in soup.select(".event-card"):
         title = card.select_one(".event-title")
@@ -0,0 +1,105 @@
+# scraper/schedule.py
+"""
+Adaptive revisit schedule for detail pages, one page_schedule document per source_url:
+    {_id: source_url, interval, next_due_at, checks, changes, last_checked_at, last_changed_at}
+
+Every scrape still fetches the listing pages, but only the detail pages that are due.
+A page that came back unchanged waits SCRAPE_BACKOFF times longer next time (up to
+SCRAPE_MAX_INTERVAL); a changed or new page is rechecked after SCRAPE_MIN_INTERVAL, and so is
+any page whose event starts within SCRAPE_NEAR_START_HOURS. Pages never seen are always due.
+Independently of the schedule, pages fetched within SCRAPER_SEEN_TTL seconds are not fetched
+again (e.g. a manual run right after the scheduled one).
+"""
+import os
+from datetime import timedelta
+
+from pymongo import UpdateOne
+
+from .db import schedule_coll
+from .utils import now_utc, to_bson_datetime
+
+SCHEDULE_ENABLED = os.environ.get("SCRAPER_ADAPTIVE", "1") == "1"
+# the beat schedule runs every 30 minutes, so shorter intervals only matter for manual runs
+MIN_INTERVAL = float(os.environ.get("SCRAPE_MIN_INTERVAL", "1800"))
+# stay well under the 7 days after which unseen events are marked inactive
+MAX_INTERVAL = float(os.environ.get("SCRAPE_MAX_INTERVAL", "86400"))
+BACKOFF = float(os.environ.get("SCRAPE_BACKOFF", "2"))
+NEAR_START_HOURS = float(os.environ.get("SCRAPE_NEAR_START_HOURS", "48"))
+# runs don't start at exactly the same offset, so a page due a little after "now" counts as due
+DUE_SLACK = timedelta(minutes=2)
+# 0 disables the recently-seen check
+SEEN_TTL = float(os.environ.get("SCRAPER_SEEN_TTL", "900"))
+
+
+def next_interval(previous, changed, start_time=None, now=None):
+    """Seconds until the page should be fetched again."""
+    now = now or now_utc()
+    if changed or not previous:
+        interval = MIN_INTERVAL
+    else:
+        interval = min(previous * BACKOFF, MAX_INTERVAL)
+    start_time = to_bson_datetime(start_time)
+    if start_time and now <= start_time <= now + timedelta(hours=NEAR_START_HOURS):
+        interval = MIN_INTERVAL
+    return interval
+
+
+def split_urls(urls, now=None):
+    """
+    Partition listing urls with one page_schedule query into (fetch, recently_seen, not_due), each in order:
+    recently_seen were fetched within SEEN_TTL, not_due (only with the adaptive schedule enabled)
+    haven't reached next_due_at. Unknown urls are always fetched.
+    """
+    urls = list(urls)
+    if not urls:
+        return [], [], []
+    now = now or now_utc()
+    seen_after = now - timedelta(seconds=SEEN_TTL)
+    known = {
+        d["_id"]: d
+        for d in schedule_coll.find({"_id": {"$in": urls}}, {"next_due_at": 1, "last_checked_at": 1})
+    }
+    fetch, recently_seen, not_due = [], [], []
+    for url in urls:
+        page = known.get(url)
+        if page is None:
+            fetch.append(url)
+        elif SEEN_TTL > 0 and page.get("last_checked_at") and page["last_checked_at"] > seen_after:
+            recently_seen.append(url)
+        elif SCHEDULE_ENABLED and page.get("next_due_at") and page["next_due_at"] > now + DUE_SLACK:
+            not_due.append(url)
+        else:
+            fetch.append(url)
+    return fetch, recently_seen, not_due
+
+
+def record_results(items, results, now=None):
+    """
+    Update the schedule from process_items(items) -> results ("inserted" / "updated" / "unchanged").
+    One query for the current intervals and one bulk_write.
+    """
+    now = now or now_utc()
+    pages = {}
+    for item, res in zip(items, results):
+        if item.get("source_url"):
+            # a url listed twice counts as changed if either copy was
+            prev = pages.get(item["source_url"])
+            changed = res != "unchanged" or (prev is not None and prev[0])
+            pages[item["source_url"]] = (changed, item.get("start_time"))
+    if not pages:
+        return
+    intervals = {
+        d["_id"]: d.get("interval")
+        for d in schedule_coll.find({"_id": {"$in": list(pages)}}, {"interval": 1})
+    }
+    ops = []
+    for url, (changed, start_time) in pages.items():
+        interval = next_interval(intervals.get(url), changed, start_time, now)
+        update = {
+            "$set": {"interval": interval, "next_due_at": now + timedelta(seconds=interval), "last_checked_at": now},
+            "$inc": {"checks": 1, "changes": 1 if changed else 0},
+        }
+        if changed:
+            update["$set"]["last_changed_at"] = now
+        ops.append(UpdateOne({"_id": url}, update, upsert=True))
+    schedule_coll.bulk_write(ops, ordered=False)
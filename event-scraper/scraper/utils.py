@@ -1,5 +1,5 @@
 import hashlib
-from datetime import datetime
+from datetime import datetime, timezone
 from dateutil import parser as dateparser
 
 def make_checksum(*args):
@@ -18,4 +18,16 @@ def parse_datetime(dt_str):
         return None
     
 def now_iso():
-    return datetime.utcnow().isoformat() + "Z"
\ No newline at end of file
+    return datetime.utcnow().isoformat() + "Z"
+
+def now_utc():
+    # naive UTC datetime; pymongo stores it as a BSON date
+    return datetime.utcnow()
+
+def to_bson_datetime(dt):
+    """Naive datetime for Mongo: aware values are converted to UTC, naive ones kept as parsed."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
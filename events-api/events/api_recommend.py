@@ -1,6 +1,10 @@
+import json
+
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from rest_framework.utils.encoders import JSONEncoder
 
 
 class RecommendationView(APIView):
@@ -14,8 +18,10 @@ class RecommendationView(APIView):
           "type": "by_event" | "by_user",
           "event_id": "<mongo_id>",           # required for by_event
           "preferences": "music, free shows", # required for by_user
-          "k": 8
+          "k": 8,
+          "city": "Sydney", "from": "2025-01-01", "to": "...", "status": "new"  # optional filters
         }
+        Filters may also be passed as query params, same names as GET /api/events/.
         """
         data = request.data or {}
         typ = data.get("type")
@@ -25,8 +31,9 @@ class RecommendationView(APIView):
             from .recommender import (
                 recommend_by_event,
                 recommend_by_preferences,
-                fetch_events_with_scores,
+                live_recommendations,
                 load_index,
+                parse_filters,
             )
         except Exception as e:
             return Response(
@@ -34,23 +41,88 @@ class RecommendationView(APIView):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        # ensure index exists
+        # ensure index exists (served from the in-process index holder)
         idx, mapping = load_index()
         if idx is None:
             return Response({"detail": "Index not built"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
+        param = lambda name: data.get(name) or request.GET.get(name)
+        try:
+            filters = parse_filters(param("city"), param("from"), param("to"), param("status"))
+        except ValueError:
+            return Response({"detail": "from/to must be ISO dates"}, status=status.HTTP_400_BAD_REQUEST)
+
         if typ == "by_event":
             event_id = data.get("event_id")
             if not event_id:
                 return Response({"detail":"event_id required"}, status=status.HTTP_400_BAD_REQUEST)
-            pairs = recommend_by_event(event_id, k=k)
+            search = lambda n: recommend_by_event(event_id, k=n, filters=filters)
         elif typ == "by_user":
             prefs = data.get("preferences")
             if not prefs:
                 return Response({"detail":"preferences required"}, status=status.HTTP_400_BAD_REQUEST)
-            pairs = recommend_by_preferences(prefs, k=k)
+            search = lambda n: recommend_by_preferences(prefs, k=n, filters=filters)
         else:
             return Response({"detail":"type must be 'by_event' or 'by_user'"}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = fetch_events_with_scores(pairs)
+        results = live_recommendations(search, k, filters=filters)
         return Response({"results": results})
+
+
+class RecommendationBatchView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        """
+        POST /api/recommendations/batch/
+        body:
+        {
+          "type": "by_event" | "by_user",
+          "event_ids": ["<mongo_id>", ...],    # for by_event
+          "preferences": ["music", ...],       # for by_user
+          "k": 8,
+          "city": ..., "from": ..., "to": ..., "status": ...  # optional filters, applied to every query
+        }
+        Streams one JSON line per query, in request order:
+        {"key": "<event_id or preferences>", "results": [...]}   ("error" instead of results for unknown events)
+        """
+        data = request.data or {}
+        typ = data.get("type")
+        k = int(data.get("k", 8))
+
+        try:
+            from .recommender import RECOMMEND_BATCH_MAX, load_index, parse_filters, recommend_batch
+        except Exception as e:
+            return Response(
+                {"detail": "Recommendation dependencies not installed", "error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        idx, mapping = load_index()
+        if idx is None:
+            return Response({"detail": "Index not built"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        if typ == "by_event":
+            keys = data.get("event_ids")
+        elif typ == "by_user":
+            keys = data.get("preferences")
+        else:
+            return Response({"detail":"type must be 'by_event' or 'by_user'"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(keys, list) or not keys or not all(isinstance(key, str) and key for key in keys):
+            field = "event_ids" if typ == "by_event" else "preferences"
+            return Response({"detail": f"{field} must be a non-empty list of strings"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(keys) > RECOMMEND_BATCH_MAX:
+            return Response({"detail": f"at most {RECOMMEND_BATCH_MAX} queries per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        param = lambda name: data.get(name) or request.GET.get(name)
+        try:
+            filters = parse_filters(param("city"), param("from"), param("to"), param("status"))
+        except ValueError:
+            return Response({"detail": "from/to must be ISO dates"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def lines():
+            for key, results in recommend_batch(typ, keys, k=k, filters=filters):
+                line = {"key": key, "results": results} if results is not None else {"key": key, "error": "event not found"}
+                yield json.dumps(line, cls=JSONEncoder) + "\n"
+
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
@@ -0,0 +1,40 @@
+import os
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+def warm_up_recommender(encode=True):
+    """
+    Preload the recommender (model, index, one dummy encode) and print the timings.
+    Called from events_api/wsgi.py and gunicorn.conf.py when RECOMMENDER_WARMUP is set.
+    """
+    try:
+        from .recommender import warm_up
+
+        timings = warm_up(encode=encode)
+    except Exception as e:
+        # recommendations are optional; the endpoint reports missing deps / index itself
+        print("Recommender warm-up failed:", e)
+        return None
+    print(
+        f"Recommender warm-up (pid {os.getpid()}):",
+        ", ".join(f"{name} {value:.2f}s" if isinstance(value, float) else f"{name} {value}" for name, value in timings.items()),
+    )
+    return timings
+
+
+class EventsConfig(AppConfig):
+    name = "events"
+
+    def ready(self):
+        if not getattr(settings, "MONGO_ENSURE_INDEXES", False):
+            return
+        from pymongo.errors import PyMongoError
+        from .indexes import ensure_indexes
+
+        try:
+            ensure_indexes()
+        except PyMongoError as e:
+            # Mongo may not be reachable yet; `manage.py ensure_indexes` can be run later.
+            print("Could not ensure Mongo indexes:", e)
@@ -0,0 +1,109 @@
+"""
+Response cache for the read-only event endpoints.
+
+Entries are keyed on the events "generation", a counter in Mongo (cache_state collection)
+bumped by the scraper's run_once, mark_inactive_task and AdminImportView, so a bump makes
+every older entry unreachable. Responses carry an ETag; If-None-Match gets a 304.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from pymongo.errors import PyMongoError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .mongo import db
+
+cache_state_coll = db["cache_state"]
+
+_generation = None
+_generation_read_at = 0.0
+_generation_lock = threading.Lock()
+
+
+def current_generation():
+    """The events generation, re-read from Mongo at most every RESPONSE_CACHE_GENERATION_CHECK seconds."""
+    global _generation, _generation_read_at
+    now = time.monotonic()
+    if _generation is not None and now - _generation_read_at < settings.RESPONSE_CACHE_GENERATION_CHECK:
+        return _generation
+    with _generation_lock:
+        if _generation is None or now - _generation_read_at >= settings.RESPONSE_CACHE_GENERATION_CHECK:
+            doc = cache_state_coll.find_one({"_id": "events"})
+            _generation = (doc or {}).get("generation", 0)
+            _generation_read_at = now
+    return _generation
+
+
+def bump_generation():
+    """Invalidate all cached event responses (call after writing to the events collection)."""
+    global _generation
+    try:
+        cache_state_coll.update_one({"_id": "events"}, {"$inc": {"generation": 1}}, upsert=True)
+    except PyMongoError as e:
+        # cached responses then expire on their TTL instead
+        print("Could not bump events generation:", e)
+    # this process sees its own bump right away
+    _generation = None
+
+
+def _cache_key(request, generation):
+    # sorted so ?a=1&b=2 and ?b=2&a=1 share an entry; host is part of it because
+    # paginated responses contain absolute next/previous links
+    params = sorted((k, v) for k in request.GET for v in request.GET.getlist(k))
+    raw = json.dumps([request.get_host(), request.path, params])
+    return f"events:{generation}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+def _with_headers(response, etag):
+    response["ETag"] = etag
+    response["Cache-Control"] = f"public, max-age={settings.RESPONSE_CACHE_MAX_AGE}"
+    return response
+
+
+def cached_get(method):
+    """
+    Decorator for APIView.get: serves 200 responses from the cache and answers
+    If-None-Match with 304. Falls through to the view if the generation can't be read
+    or the cache backend fails.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return method(self, request, *args, **kwargs)
+        try:
+            key = _cache_key(request, current_generation())
+        except PyMongoError:
+            return method(self, request, *args, **kwargs)
+
+        try:
+            entry = cache.get(key)
+        except Exception as e:
+            # cache backend down (e.g. Redis): serve uncached
+            print("Response cache unavailable:", e)
+            return method(self, request, *args, **kwargs)
+        if entry is None:
+            response = method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = json.dumps(response.data, cls=JSONEncoder, sort_keys=True)
+            entry = {"data": response.data, "etag": '"%s"' % hashlib.sha1(body.encode("utf-8")).hexdigest()}
+            try:
+                cache.set(key, entry, settings.RESPONSE_CACHE_TTL)
+            except Exception as e:
+                print("Response cache unavailable:", e)
+        else:
+            response = Response(entry["data"])
+
+        if entry["etag"] in request.headers.get("If-None-Match", ""):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        return _with_headers(response, entry["etag"])
+
+    return wrapper
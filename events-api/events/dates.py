@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+from dateutil import parser as dateparser
+
+
+def to_datetime(value):
+    """
+    datetime or date string -> naive UTC datetime (what pymongo stores and returns for BSON dates).
+    Values without a timezone are kept as they are. Returns None for empty/unparseable values.
+    """
+    if isinstance(value, str):
+        if not value.strip():
+            return None
+        try:
+            value = dateparser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
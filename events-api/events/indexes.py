@@ -0,0 +1,128 @@
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+from .mongo import db
+
+# collection -> list of (keys, options). Names are fixed so re-running is a no-op.
+# The scraper declares the same events indexes in event-scraper/scraper/db.py; keep them in sync.
+INDEX_SPECS = {
+    "events": [
+        # source_url is missing on some scraped items, so uniqueness only applies to real urls
+        (
+            [("source_url", ASCENDING)],
+            {
+                "name": "source_url_unique",
+                "unique": True,
+                "partialFilterExpression": {"source_url": {"$type": "string"}},
+            },
+        ),
+        ([("checksum", ASCENDING)], {"name": "checksum"}),
+        # list endpoint sorts on (start_time, _id)
+        ([("start_time", ASCENDING), ("_id", ASCENDING)], {"name": "start_time_id"}),
+        ([("status", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)], {"name": "status_start_time"}),
+        ([("source_name", ASCENDING), ("last_scraped_at", ASCENDING)], {"name": "source_name_last_scraped_at"}),
+        # mark_inactive_task's range scan
+        ([("last_scraped_at", ASCENDING)], {"name": "last_scraped_at"}),
+        # ?q= search on the list endpoint
+        (
+            [("title", TEXT), ("venue", TEXT), ("city", TEXT), ("description", TEXT)],
+            {
+                "name": "events_text",
+                "weights": {"title": 10, "venue": 3, "city": 3, "description": 1},
+                "default_language": "english",
+            },
+        ),
+    ],
+    "subscriptions": [
+        ([("event_id", ASCENDING)], {"name": "event_id"}),
+    ],
+    # latest runs first
+    "scrape_runs": [
+        ([("started_at", DESCENDING)], {"name": "started_at"}),
+    ],
+}
+
+
+def ensure_indexes(database=None):
+    """
+    Create every index in INDEX_SPECS (idempotent).
+    Returns {collection: {index_name: "ok" | "<error>"}}; a failing index doesn't stop the others.
+    """
+    database = database if database is not None else db
+    report = {}
+    for coll_name, specs in INDEX_SPECS.items():
+        coll = database[coll_name]
+        report[coll_name] = {}
+        for keys, options in specs:
+            try:
+                coll.create_index(keys, **options)
+                report[coll_name][options["name"]] = "ok"
+            except OperationFailure as e:
+                # e.g. duplicate source_url values already stored
+                report[coll_name][options["name"]] = str(e)
+    return report
+
+
+# Representative queries issued by the API and the scraper, used for explain().
+def _sample_queries():
+    return [
+        ("events list", "events", {}, [("start_time", ASCENDING), ("_id", ASCENDING)]),
+        ("events list by status", "events", {"status": "new"}, [("start_time", ASCENDING), ("_id", ASCENDING)]),
+        (
+            "events list by date range",
+            "events",
+            {"start_time": {"$gte": datetime(2000, 1, 1), "$lte": datetime(2000, 2, 1)}},
+            [("start_time", ASCENDING), ("_id", ASCENDING)],
+        ),
+        ("events search", "events", {"$text": {"$search": "music"}}, None),
+        ("event detail", "events", {"_id": None}, None),
+        ("scraper lookup by source_url", "events", {"source_url": {"$in": [""]}}, None),
+        ("scraper lookup by checksum", "events", {"checksum": {"$in": [""]}}, None),
+        (
+            "scraper mark inactive",
+            "events",
+            {"source_name": "", "last_scraped_at": {"$lt": datetime(2000, 1, 1)}, "status": {"$ne": "imported"}},
+            None,
+        ),
+        (
+            "mark_inactive_task",
+            "events",
+            {"status": {"$nin": ["imported", "inactive"]}, "last_scraped_at": {"$lt": datetime(2000, 1, 1)}},
+            None,
+        ),
+        ("subscriptions by event", "subscriptions", {"event_id": ""}, None),
+    ]
+
+
+def _plan_indexes(plan):
+    """Collect index names (or COLLSCAN) from a winning plan tree."""
+    if not plan:
+        return []
+    found = []
+    if plan.get("indexName"):
+        found.append(plan["indexName"])
+    elif plan.get("stage") in {"COLLSCAN", "IDHACK", "EXPRESS_IXSCAN"}:
+        found.append(plan["stage"])
+    for child_key in ("inputStage", "queryPlan"):
+        found.extend(_plan_indexes(plan.get(child_key)))
+    for child in plan.get("inputStages", []):
+        found.extend(_plan_indexes(child))
+    return found
+
+
+def explain_queries(database=None):
+    """
+    Run explain() on the sample queries and report which index each one uses.
+    Returns a list of { name, collection, indexes }.
+    """
+    database = database if database is not None else db
+    out = []
+    for name, coll_name, query, sort in _sample_queries():
+        cursor = database[coll_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.limit(1).explain().get("queryPlanner", {}).get("winningPlan", {})
+        out.append({"name": name, "collection": coll_name, "indexes": _plan_indexes(plan) or ["?"]})
+    return out
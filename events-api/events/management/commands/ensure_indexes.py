@@ -0,0 +1,23 @@
+# events/management/commands/ensure_indexes.py
+from django.core.management.base import BaseCommand
+from events.indexes import ensure_indexes, explain_queries
+
+class Command(BaseCommand):
+    help = "Create the MongoDB indexes used by the API and scraper (safe to re-run)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Also report which index each API/scraper query uses.",
+        )
+
+    def handle(self, *args, **options):
+        report = ensure_indexes()
+        for coll_name, indexes in report.items():
+            for name, result in indexes.items():
+                print(f"{coll_name}.{name}: {result}")
+
+        if options["explain"]:
+            for row in explain_queries():
+                print(f"{row['name']} ({row['collection']}): {', '.join(row['indexes'])}")
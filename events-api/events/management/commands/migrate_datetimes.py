@@ -0,0 +1,108 @@
+# events/management/commands/migrate_datetimes.py
+import time
+
+from django.core.management.base import BaseCommand
+from pymongo import ASCENDING, UpdateOne
+
+from events.dates import to_datetime
+from events.mongo import db
+
+# collection -> fields that used to be stored as ISO strings
+DATETIME_FIELDS = {
+    "events": ["start_time", "last_scraped_at", "created_at", "importedAt"],
+    "subscriptions": ["created_at"],
+}
+
+# {_id: "datetimes:<collection>.<field>", last_id}: where an interrupted run continues
+migrations_coll = db["migrations"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert timestamp fields stored as ISO strings into BSON dates. Streams documents in _id order "
+        "in batches and records progress, so an interrupted run continues where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the documents that still hold strings.",
+        )
+        parser.add_argument(
+            "--field",
+            action="append",
+            help="Only migrate <collection>.<field> (repeatable), e.g. events.start_time.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore saved progress and scan from the beginning.",
+        )
+
+    def handle(self, *args, **options):
+        targets = [(c, f) for c, fields in DATETIME_FIELDS.items() for f in fields]
+        if options["field"]:
+            targets = [(c, f) for c, f in targets if f"{c}.{f}" in options["field"]]
+        for coll_name, field in targets:
+            query = {field: {"$type": "string"}}
+            if options["dry_run"]:
+                print(f"{coll_name}.{field}: {db[coll_name].count_documents(query)} string values")
+                continue
+            self.migrate(coll_name, field, options["batch_size"], options["restart"])
+
+    def migrate(self, coll_name, field, batch_size, restart):
+        coll = db[coll_name]
+        progress_id = f"datetimes:{coll_name}.{field}"
+        saved = None if restart else migrations_coll.find_one({"_id": progress_id})
+        query = {field: {"$type": "string"}}
+        if saved and saved.get("last_id") is not None:
+            query["_id"] = {"$gt": saved["last_id"]}
+            print(f"{coll_name}.{field}: resuming after {saved['last_id']}")
+
+        total = coll.count_documents(query)
+        seen = converted = skipped = 0
+        started = time.monotonic()
+        cursor = coll.find(query, {field: 1}).sort("_id", ASCENDING).batch_size(batch_size)
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                c, s = self._convert(coll, field, batch)
+                seen, converted, skipped = seen + len(batch), converted + c, skipped + s
+                self._save_progress(progress_id, batch[-1]["_id"])
+                self._report(coll_name, field, seen, total, started)
+                batch = []
+        if batch:
+            c, s = self._convert(coll, field, batch)
+            seen, converted, skipped = seen + len(batch), converted + c, skipped + s
+            self._save_progress(progress_id, batch[-1]["_id"])
+        print(f"{coll_name}.{field}: converted {converted}, unparseable {skipped} ({time.monotonic() - started:.1f}s)")
+        # finished: the next run rescans, so values written as strings later still get converted
+        migrations_coll.delete_one({"_id": progress_id})
+
+    @staticmethod
+    def _convert(coll, field, docs):
+        ops = []
+        skipped = 0
+        for doc in docs:
+            value = to_datetime(doc[field])
+            if value is None:
+                skipped += 1
+                continue
+            # only if it wasn't changed in the meantime
+            ops.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+        converted = coll.bulk_write(ops, ordered=False).modified_count if ops else 0
+        return converted, skipped
+
+    @staticmethod
+    def _save_progress(progress_id, last_id):
+        migrations_coll.update_one({"_id": progress_id}, {"$set": {"last_id": last_id}}, upsert=True)
+
+    @staticmethod
+    def _report(coll_name, field, seen, total, started):
+        elapsed = time.monotonic() - started
+        rate = seen / elapsed if elapsed else 0.0
+        pct = 100.0 * seen / total if total else 100.0
+        print(f"{coll_name}.{field}: {seen}/{total} ({pct:.0f}%), {rate:.0f} docs/s")
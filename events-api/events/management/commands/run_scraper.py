@@ -7,5 +7,6 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         # Run the task synchronously (not via worker) to reuse the same code path
-        res = run_scraper_task.apply()  # runs task immediately
+        # no fan-out: sources still run in parallel inside run_once
+        res = run_scraper_task.apply(kwargs={"fanout": False})  # runs task immediately
         print(res.get())
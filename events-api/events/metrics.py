@@ -0,0 +1,78 @@
+"""
+Prometheus metrics for the API: request timing middleware and the /metrics view.
+
+The histograms live in event-scraper/scraper/instrumentation.py, shared with the scraper.
+They are per process, so with several gunicorn workers each scrape of /metrics sees one worker.
+Without event-scraper/ next to the API (e.g. an image built from events-api/ alone) the
+timers are no-ops and /metrics answers 503; everything else works as before.
+"""
+import contextlib
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.http import HttpResponse
+
+
+class _NoopHistogram:
+    def observe(self, value, **labels):
+        pass
+
+    def time(self, **labels):
+        return contextlib.nullcontext()
+
+
+def _import_instrumentation():
+    """scraper.instrumentation, or None if event-scraper isn't available."""
+    try:
+        from scraper import instrumentation  # type: ignore
+    except ModuleNotFoundError:
+        event_scraper_root = Path(__file__).resolve().parents[2] / "event-scraper"
+        if not event_scraper_root.is_dir():
+            return None
+        if str(event_scraper_root) not in sys.path:
+            sys.path.insert(0, str(event_scraper_root))
+        try:
+            from scraper import instrumentation  # type: ignore
+        except ModuleNotFoundError:
+            return None
+    return instrumentation
+
+
+instrumentation = _import_instrumentation()
+METRICS_AVAILABLE = instrumentation is not None
+if not METRICS_AVAILABLE:
+    _noop = _NoopHistogram()
+    instrumentation = SimpleNamespace(
+        REQUEST_SECONDS=_noop,
+        EMBED_SECONDS=_noop,
+        SEARCH_SECONDS=_noop,
+        MongoCommandTimer=None,
+        render=lambda: "",
+    )
+
+
+class MetricsMiddleware:
+    """Observes http_request_seconds per route pattern (not raw path, to keep label values few)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        instrumentation.REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=match.route if match else "unmatched",
+            method=request.method,
+            status=response.status_code,
+        )
+        return response
+
+
+def metrics_view(request):
+    if not METRICS_AVAILABLE:
+        return HttpResponse("metrics unavailable: event-scraper/ not found\n", status=503, content_type="text/plain")
+    return HttpResponse(instrumentation.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
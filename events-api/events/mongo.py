@@ -2,15 +2,40 @@ from django.conf import settings
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
+from .metrics import instrumentation
+
 client = MongoClient(
     settings.MONGO_URI,
     serverSelectionTimeoutMS=2000,
     connectTimeoutMS=2000,
     socketTimeoutMS=2000,
+    event_listeners=[instrumentation.MongoCommandTimer()] if instrumentation.MongoCommandTimer else [],
 )
 db = client[settings.MONGO_DB]
 events_coll = db["events"]
 subscriptions_coll = db["subscriptions"]
+# one document per run_scraper_task run (counts, per-source status, stage timings)
+scrape_runs_coll = db["scrape_runs"]
+
+# Description length kept in list responses (full text is on the detail endpoint)
+LIST_DESCRIPTION_CHARS = 300
+
+# Fields returned by the events list endpoint
+EVENT_LIST_PROJECTION = {
+    "title": 1,
+    "start_time": 1,
+    "venue": 1,
+    "city": 1,
+    "tags": 1,
+    "image_url": 1,
+    "source_url": 1,
+    "source_name": 1,
+    "status": 1,
+    "importedBy": 1,
+    "importedAt": 1,
+    "importNotes": 1,
+    "description": {"$substrCP": [{"$ifNull": ["$description", ""]}, 0, LIST_DESCRIPTION_CHARS]},
+}
 
 # Help to convert mongo desc into JSON-serializable dict
 def serialize_event(doc):
@@ -0,0 +1,122 @@
+import base64
+
+from bson import json_util
+from django.conf import settings
+from pymongo import ASCENDING
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class MongoPagination:
+    """
+    Pagination pushed into the Mongo query (skip/limit, or keyset on (start_time, _id) via ?cursor=).
+    Responses keep PageNumberPagination's {count, next, previous, results} shape.
+    On the default sort the first page's `next` is already a cursor link, so clients following
+    `next` switch to keyset pagination; ?page=N stays available for random access.
+    """
+
+    page_size = settings.REST_FRAMEWORK.get("PAGE_SIZE", 12)
+    max_page_size = 100
+    page_query_param = "page"
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    sort = [("start_time", ASCENDING), ("_id", ASCENDING)]
+    # keyset cursors only make sense for the default sort
+    keyset = True
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET.get(self.page_size_query_param) or self.page_size)
+        except ValueError:
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate(self, collection, query, request, projection=None):
+        """Return the docs for the requested page; call get_paginated_response() afterwards."""
+        self.request = request
+        self.size = self.get_page_size(request)
+        self.count = collection.count_documents(query) if query else collection.estimated_document_count()
+
+        if self.keyset and projection and "start_time" not in projection and any(v != 0 for v in projection.values()):
+            # cursors are built from start_time, so an inclusion projection must return it
+            projection = {**projection, "start_time": 1}
+
+        token = request.GET.get(self.cursor_query_param)
+        if token is not None and self.keyset:
+            # an empty ?cursor= starts keyset pagination from the beginning
+            return self._paginate_keyset(collection, query, projection, token or None)
+
+        try:
+            self.page = int(request.GET.get(self.page_query_param) or 1)
+        except ValueError:
+            raise NotFound("Invalid page.")
+        if self.page < 1 or (self.page > 1 and (self.page - 1) * self.size >= self.count):
+            raise NotFound("Invalid page.")
+
+        cursor = (
+            collection.find(query, projection)
+            .sort(self.sort)
+            .skip((self.page - 1) * self.size)
+            .limit(self.size)
+        )
+        docs = list(cursor)
+        has_more = self.page * self.size < self.count
+        if has_more and self.keyset and self.page == 1:
+            self.next_url = self._cursor_url(docs[-1])
+        else:
+            self.next_url = self._page_url(self.page + 1) if has_more else None
+        self.previous_url = self._page_url(self.page - 1) if self.page > 1 else None
+        return docs
+
+    def _paginate_keyset(self, collection, query, projection, token):
+        """token None: the first keyset page."""
+        keyset_query = query
+        if token is not None:
+            start_time, last_id = self.decode_cursor(token)
+            if start_time is None:
+                # nulls sort first: everything with a start_time comes after
+                after = {"$or": [{"start_time": {"$ne": None}}, {"start_time": None, "_id": {"$gt": last_id}}]}
+            else:
+                after = {"$or": [{"start_time": {"$gt": start_time}}, {"start_time": start_time, "_id": {"$gt": last_id}}]}
+            keyset_query = {"$and": [query, after]} if query else after
+
+        docs = list(collection.find(keyset_query, projection).sort(self.sort).limit(self.size + 1))
+        has_more = len(docs) > self.size
+        docs = docs[: self.size]
+
+        self.next_url = self._cursor_url(docs[-1]) if has_more else None
+        # keyset pages are forward-only
+        self.previous_url = None
+        return docs
+
+    def _cursor_url(self, last_doc):
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(last_doc))
+
+    def _page_url(self, page):
+        url = self.request.build_absolute_uri()
+        if page == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, page)
+
+    @staticmethod
+    def encode_cursor(doc):
+        raw = json_util.dumps([doc.get("start_time"), doc["_id"]])
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(token):
+        try:
+            start_time, last_id = json_util.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+        except Exception:
+            raise NotFound("Invalid cursor.")
+        return start_time, last_id
+
+    def get_paginated_response(self, results):
+        return Response({
+            "count": self.count,
+            "next": self.next_url,
+            "previous": self.previous_url,
+            "results": results,
+        })
@@ -1,8 +1,23 @@
 import os
+import hashlib
 import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from .mongo import events_coll, serialize_event
+from .dates import to_datetime
+from .metrics import instrumentation
+from .mongo import events_coll, serialize_event, EVENT_LIST_PROJECTION
+from .vector_index import (
+    INDEX_TYPE,
+    can_remove as can_remove_from_index,
+    describe as describe_index,
+    filtered_search_params,
+    make_index,
+    tune_index,
+)
 
 try:
     import faiss  # type: ignore
@@ -14,156 +29,934 @@ except Exception:
 # Config
 MODEL_NAME = os.environ.get("EMBED_MODEL", "all-MiniLM-L6-v2")  # small, fast model
 EMBED_DIM = 384  # all-MiniLM-L6-v2 -> 384 dim
+# How the model runs on CPU:
+#   torch       fp32 PyTorch (default)
+#   torch-int8  PyTorch with dynamically int8-quantized Linear layers
+#   onnx        ONNX Runtime (sentence-transformers>=3.2 + optimum[onnxruntime])
+#   onnx-int8   ONNX Runtime with the model's pre-quantized int8 export (EMBED_ONNX_FILE)
+EMBED_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "torch")
+EMBED_ONNX_FILE = os.environ.get("EMBED_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+# Vectors differ slightly between backends: the embedding cache and the index are keyed on this,
+# so switching backend re-embeds instead of mixing vectors
+MODEL_ID = MODEL_NAME if EMBED_BACKEND == "torch" else f"{MODEL_NAME}@{EMBED_BACKEND}"
 INDEX_DIR = os.environ.get("FAISS_INDEX_DIR", os.path.join(os.getcwd(), "faiss_index"))
 INDEX_FILE = os.path.join(INDEX_DIR, "events.index")
 EMBEDDINGS_FILE = os.path.join(INDEX_DIR, "embeddings.npy")
 MAPPING_FILE = os.path.join(INDEX_DIR, "id_mapping.json")
+# label -> event _id as raw 12-byte ObjectIds (all zeros for removed labels)
+IDS_FILE = os.path.join(INDEX_DIR, "ids.npy")
+# label -> event checksum, only read by build_index to find changed events (the API never opens it)
+CHECKSUMS_FILE = os.path.join(INDEX_DIR, "checksums.json")
+# Per-label filter metadata (start time, status, source, city), written with each build
+METADATA_FILE = os.path.join(INDEX_DIR, "metadata.npz")
+# Memory-map embeddings.npy so gunicorn workers share the same pages
+INDEX_MMAP = os.environ.get("INDEX_MMAP", "1") == "1"
+# numpy fallback storage: float32 | float16 (half the memory) | int8 (quarter, per-dimension scales)
+EMBED_STORAGES = ("float32", "float16", "int8")
+EMBED_STORAGE = os.environ.get("EMBED_STORAGE", "float32")
+# rows converted to float32 at a time when scanning float16/int8 storage
+INDEX_SCAN_BLOCK = int(os.environ.get("INDEX_SCAN_BLOCK", "65536"))
+# How often (seconds) to stat the index files for changes
+INDEX_CHECK_INTERVAL = float(os.environ.get("INDEX_CHECK_INTERVAL", "5"))
+# Compact the index once this fraction of its rows are removed (tombstoned) events
+INDEX_COMPACT_RATIO = float(os.environ.get("INDEX_COMPACT_RATIO", "0.2"))
+# Query embedding cache: in-memory LRU size, optional on-disk directory
+EMBED_CACHE_SIZE = int(os.environ.get("EMBED_CACHE_SIZE", "1024"))
+EMBED_CACHE_DIR = os.environ.get("EMBED_CACHE_DIR", "")
+# Ask the index for this many times k candidates, to make up for inactive events
+RECOMMEND_OVERFETCH = int(os.environ.get("RECOMMEND_OVERFETCH", "2"))
+# Filters matching at most this many events are scored exactly instead of through the ANN index
+FILTER_EXACT_MAX = int(os.environ.get("FILTER_EXACT_MAX", "2048"))
+# Batch requests: queries per encode/search/hydrate round, and max queries per request
+RECOMMEND_BATCH_SIZE = int(os.environ.get("RECOMMEND_BATCH_SIZE", "256"))
+RECOMMEND_BATCH_MAX = int(os.environ.get("RECOMMEND_BATCH_MAX", "10000"))
 
-# Lazy model load
+# start_time value for events without one
+NO_TIME = np.iinfo(np.int64).min
+
+def load_model(backend=None):
+    """A new SentenceTransformer for MODEL_NAME running on the given backend (default EMBED_BACKEND)."""
+    backend = backend or EMBED_BACKEND
+    if backend not in EMBED_BACKENDS:
+        raise ValueError(f"EMBED_BACKEND must be one of {', '.join(EMBED_BACKENDS)}")
+    if backend == "onnx":
+        return SentenceTransformer(MODEL_NAME, backend="onnx")
+    if backend == "onnx-int8":
+        return SentenceTransformer(MODEL_NAME, backend="onnx", model_kwargs={"file_name": EMBED_ONNX_FILE})
+    if backend == "torch-int8":
+        import torch
+
+        # dynamic quantization is CPU-only
+        model = SentenceTransformer(MODEL_NAME, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return SentenceTransformer(MODEL_NAME)
+
+# Lazy model load (or up front via warm_up)
 _model = None
+_model_lock = threading.Lock()
 def get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer(MODEL_NAME)
+        with _model_lock:
+            # another thread may have loaded it while we waited
+            if _model is None:
+                _model = load_model()
     return _model
 
-def embed_texts(texts):
-    model = get_model()
-    embeddings = model.encode(texts, show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True)
-    return embeddings  # shape (n, d)
+class _EmbeddingCache:
+    """
+    Bounded LRU of text embeddings keyed by sha256(model id + text),
+    optionally backed by one .npy file per key under EMBED_CACHE_DIR.
+    """
+
+    def __init__(self, max_items, directory=None):
+        self.max_items = max_items
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256((MODEL_ID + "\0" + text).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is not None:
+                self._items.move_to_end(key)
+                return vec
+        if self.directory:
+            try:
+                vec = np.load(os.path.join(self.directory, key + ".npy"))
+            except (OSError, ValueError):
+                return None
+            self._remember(key, vec)
+            return vec
+        return None
+
+    def put(self, key, vec):
+        self._remember(key, vec)
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                _atomic_write(os.path.join(self.directory, key + ".npy"), lambda tmp: _save_npy(tmp, vec))
+            except OSError as e:
+                # the in-memory copy is enough to answer; don't fail the request over the disk cache
+                print("Embedding cache write failed:", e)
+
+    def _remember(self, key, vec):
+        with self._lock:
+            self._items[key] = vec
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+_embedding_cache = _EmbeddingCache(EMBED_CACHE_SIZE, EMBED_CACHE_DIR or None)
+
+def embed_texts(texts, use_cache=True):
+    """
+    Embed texts with the model; with use_cache, previously seen texts come from the embedding cache
+    and only the misses are encoded (in one batch).
+    """
+    if not use_cache:
+        model = get_model()
+        with instrumentation.EMBED_SECONDS.time(backend=EMBED_BACKEND):
+            embeddings = model.encode(texts, show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True)
+        return embeddings  # shape (n, d)
+
+    keys = [_embedding_cache.key(t) for t in texts]
+    vectors = [_embedding_cache.get(key) for key in keys]
+    missing = [i for i, vec in enumerate(vectors) if vec is None]
+    if missing:
+        fresh = embed_texts([texts[i] for i in missing], use_cache=False)
+        for i, vec in zip(missing, fresh):
+            vec = np.asarray(vec, dtype="float32")
+            _embedding_cache.put(keys[i], vec)
+            vectors[i] = vec
+    if not vectors:
+        return np.zeros((0, EMBED_DIM), dtype="float32")
+    return np.vstack(vectors)
+
+def _event_text(doc):
+    # create a short textual representation for embedding
+    title = doc.get("title","") or ""
+    desc = doc.get("description","") or ""
+    venue = doc.get("venue","") or ""
+    return " | ".join([title, venue, desc])
 
-def build_index(rebuild=True, batch_size=256):
+def _embed_events(mongo_ids, batch_size=256):
     """
-    Build / rebuild FAISS index from all events in Mongo.
-    Stores index file and mapping from rowid -> mongo_id
+    Fetch and embed the given events, batch_size at a time.
+    Returns (found_ids, vectors); events deleted in the meantime are left out.
+    """
+    from bson.objectid import ObjectId
+
+    found, vectors = [], []
+    for i in range(0, len(mongo_ids), batch_size):
+        chunk = mongo_ids[i:i+batch_size]
+        docs = {
+            str(d["_id"]): d
+            for d in events_coll.find(
+                {"_id": {"$in": [ObjectId(m) for m in chunk]}},
+                {"title": 1, "venue": 1, "description": 1},
+            )
+        }
+        chunk = [m for m in chunk if m in docs]
+        if not chunk:
+            continue
+        found.extend(chunk)
+        # catalog texts would only churn the query-side cache
+        vectors.append(embed_texts([_event_text(docs[m]) for m in chunk], use_cache=False))
+    if not vectors:
+        return [], np.zeros((0, EMBED_DIM), dtype="float32")
+    return found, np.vstack(vectors).astype("float32")
+
+class _Embeddings:
+    """
+    Numpy fallback index: normalized vectors stored as float32, float16, or int8 codes with
+    per-dimension scales (value ~= code * scale). Scans convert INDEX_SCAN_BLOCK rows at a time,
+    never the whole matrix.
+    """
+
+    def __init__(self, rows, scales=None):
+        self.rows = rows
+        self.scales = None if scales is None else np.asarray(scales, dtype="float32")
+
+    @classmethod
+    def from_vectors(cls, vectors, storage=None):
+        storage = storage or EMBED_STORAGE
+        if storage not in EMBED_STORAGES:
+            raise ValueError(f"EMBED_STORAGE must be one of {', '.join(EMBED_STORAGES)}")
+        vectors = np.asarray(vectors, dtype="float32").reshape(-1, EMBED_DIM)
+        if storage != "int8":
+            return cls(vectors.astype(storage))
+        # scales fixed at full builds; later incremental rows are clipped to them
+        peak = np.abs(vectors).max(axis=0) if len(vectors) else np.ones(EMBED_DIM, dtype="float32")
+        store = cls(np.zeros((0, EMBED_DIM), dtype="int8"), np.maximum(peak, 1e-6) / 127.0)
+        store.rows = store.encode(vectors)
+        return store
+
+    @property
+    def shape(self):
+        return self.rows.shape
+
+    @property
+    def storage(self):
+        return self.rows.dtype.name
+
+    def encode(self, vectors):
+        vectors = np.asarray(vectors, dtype="float32")
+        if self.scales is None:
+            return vectors.astype(self.rows.dtype)
+        return np.clip(np.rint(vectors / self.scales), -127, 127).astype("int8")
+
+    def vectors(self, labels):
+        rows = self.rows[labels].astype("float32")
+        return rows * self.scales if self.scales is not None else rows
+
+    def scores(self, xq):
+        """(q, n) inner products between the query rows xq and every stored row."""
+        if self.rows.dtype == np.float32:
+            # no copy: works directly on the (possibly memory-mapped) array
+            return (xq @ self.rows.T).astype("float32")
+        # int8: fold the scales into the queries instead of into every row
+        q = xq * self.scales if self.scales is not None else xq
+        n = self.rows.shape[0]
+        out = np.empty((len(xq), n), dtype="float32")
+        for start in range(0, n, INDEX_SCAN_BLOCK):
+            block = self.rows[start:start + INDEX_SCAN_BLOCK].astype("float32")
+            out[:, start:start + len(block)] = q @ block.T
+        return out
+
+    # build-time updates; need a writable (not memory-mapped) copy
+    def grow(self, n):
+        self.rows = np.vstack([self.rows, np.zeros((n, self.rows.shape[1]), dtype=self.rows.dtype)])
+
+    def set(self, labels, vectors):
+        self.rows[labels] = self.encode(vectors)
+
+    def clear(self, labels):
+        self.rows[labels] = 0
+
+    def take(self, labels):
+        return _Embeddings(np.ascontiguousarray(self.rows[labels]), self.scales)
+
+def _read_ids(mapping):
+    """label -> raw ObjectId as a (n, 12) uint8 array (zeros for removed labels), from IDS_FILE or the JSON list of older builds."""
+    if "ids" in mapping:
+        return _ids_array(mapping["ids"])
+    if not os.path.exists(IDS_FILE):
+        return np.zeros((0, 12), dtype="uint8")
+    return np.load(IDS_FILE)
+
+def _label_ids(ids, labels):
+    """Hex mongo ids for the given labels of a _read_ids array (None for removed labels)."""
+    rows = ids[np.asarray(labels, dtype="int64")]
+    hexed = rows.tobytes().hex()
+    live = rows.any(axis=1).tolist()
+    return [hexed[i * 24:(i + 1) * 24] if alive else None for i, alive in enumerate(live)]
+
+def _with_ids(ids, labels, scores):
+    """[(mongo_id, score)] in label order, skipping missing (-1) and removed labels."""
+    keep = [(label, score) for label, score in zip(labels, scores) if 0 <= label < len(ids)]
+    mids = _label_ids(ids, [label for label, _ in keep])
+    return [(mid, float(score)) for mid, (_, score) in zip(mids, keep) if mid is not None]
+
+def _ids_array(ids):
+    raw = np.zeros((len(ids), 12), dtype="uint8")
+    for label, mid in enumerate(ids):
+        if mid is not None:
+            raw[label] = np.frombuffer(bytes.fromhex(mid), dtype="uint8")
+    return raw
+
+def _load_for_update():
+    """
+    Existing (index_or_embeddings, mapping) that can be updated incrementally,
+    or None if a full build is needed (no index yet, older format, other model).
+    """
+    if not os.path.exists(MAPPING_FILE):
+        return None
+    with open(MAPPING_FILE, "r") as f:
+        mapping = json.load(f)
+    if mapping.get("model") != MODEL_ID:
+        return None
+    raw = _read_ids(mapping)
+    # older builds kept the checksums in the mapping
+    checksums = mapping.pop("checksums", None)
+    if checksums is None:
+        if not os.path.exists(CHECKSUMS_FILE):
+            return None
+        with open(CHECKSUMS_FILE, "r") as f:
+            checksums = json.load(f)
+    if len(checksums) != len(raw):
+        return None
+
+    if _HAVE_FAISS:
+        # a different INDEX_TYPE setting needs a fresh (trained) index
+        if mapping.get("index_type") != INDEX_TYPE or not os.path.exists(INDEX_FILE):
+            return None
+        index = faiss.read_index(INDEX_FILE)
+    else:
+        # a different EMBED_STORAGE setting is re-encoded from fresh embeddings
+        if mapping.get("storage", "float32") != EMBED_STORAGE or not os.path.exists(EMBEDDINGS_FILE):
+            return None
+        # a private, writable copy (the served file may be memory-mapped)
+        index = _Embeddings(np.load(EMBEDDINGS_FILE), mapping.get("scales"))
+    if not _is_consistent(index, raw, mapping.get("ntotal")):
+        return None
+    mapping["ids"] = _label_ids(raw, np.arange(len(raw)))
+    mapping["checksums"] = checksums
+    return index, mapping
+
+def _compact(index, ids, checksums):
+    """Drop tombstoned rows and renumber labels 0..n-1."""
+    live = [label for label, mid in enumerate(ids) if mid is not None]
+    new_ids = [ids[label] for label in live]
+    new_checksums = [checksums[label] for label in live]
+    if _HAVE_FAISS:
+        # rebuilt (and retrained) from the stored vectors; ivf_pq ones come back quantized
+        vectors = index.reconstruct_batch(np.array(live, dtype="int64")) if live else np.zeros((0, EMBED_DIM), dtype="float32")
+        compacted = make_index(vectors, EMBED_DIM)
+        if live:
+            compacted.add_with_ids(vectors, np.arange(len(live), dtype="int64"))
+        return compacted, new_ids, new_checksums
+    return index.take(live), new_ids, new_checksums
+
+def _to_epoch(value):
+    """datetime or date string -> epoch seconds (naive values are UTC), None if missing/unparseable."""
+    value = to_datetime(value)
+    if value is None:
+        return None
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+def _build_metadata(ids, info):
+    """
+    Per-label arrays used to pre-filter vector search; removed labels get code -1.
+    Returns (arrays, vocab) where vocab maps each field's values to their codes.
+    """
+    vocab = {"status": {}, "source": {}, "city": {}}
+    fields = {"status": "status", "source": "source_name", "city": "city"}
+    arrays = {
+        "start_time": np.full(len(ids), NO_TIME, dtype="int64"),
+        "status": np.full(len(ids), -1, dtype="int32"),
+        "source": np.full(len(ids), -1, dtype="int32"),
+        "city": np.full(len(ids), -1, dtype="int32"),
+    }
+    for label, mid in enumerate(ids):
+        doc = info.get(mid) if mid is not None else None
+        if doc is None:
+            continue
+        epoch = _to_epoch(doc.get("start_time"))
+        if epoch is not None:
+            arrays["start_time"][label] = epoch
+        for name, field in fields.items():
+            value = str(doc.get(field) or "")
+            arrays[name][label] = vocab[name].setdefault(value, len(vocab[name]))
+    return arrays, vocab
+
+def _write_index(index, ids, checksums, info):
+    arrays, vocab = _build_metadata(ids, info)
+    _atomic_write(METADATA_FILE, lambda tmp: _save_npz(tmp, arrays))
+    mapping = {"model": MODEL_ID, "vocab": vocab}
+    if _HAVE_FAISS:
+        _atomic_write(INDEX_FILE, lambda tmp: faiss.write_index(index, tmp))
+        mapping.update({"index_type": INDEX_TYPE, "built_type": describe_index(index), "ntotal": int(index.ntotal)})
+    else:
+        _atomic_write(EMBEDDINGS_FILE, lambda tmp: _save_npy(tmp, index.rows))
+        mapping["storage"] = index.storage
+        if index.scales is not None:
+            mapping["scales"] = index.scales.tolist()
+    _atomic_write(IDS_FILE, lambda tmp: _save_npy(tmp, _ids_array(ids)))
+    _atomic_write(CHECKSUMS_FILE, lambda tmp: _save_json(tmp, checksums))
+    # write the mapping last; readers check it matches the index
+    _atomic_write(MAPPING_FILE, lambda tmp: _save_json(tmp, mapping))
+
+def build_index(full=False, batch_size=256):
+    """
+    Build / update the vector index from events in Mongo.
+    Only new or changed events (by checksum) are embedded; inactive/deleted ones are removed
+    (faiss remove_ids, or tombstoned rows in the numpy fallback) and the index is compacted
+    once tombstones pass INDEX_COMPACT_RATIO. full=True re-embeds everything.
+    Stores index file and mapping from label -> mongo_id
     """
     os.makedirs(INDEX_DIR, exist_ok=True)
-    # collect events
-    cursor = events_coll.find({"status": {"$ne": "inactive"}})  # only index active/new/updated or imported
-    docs = []
-    ids = []
-    texts = []
-    for d in cursor:
-        # create a short textual representation for embedding
-        title = d.get("title","") or ""
-        desc = d.get("description","") or ""
-        venue = d.get("venue","") or ""
-        text = " | ".join([title, venue, desc])
-        docs.append(d)
-        ids.append(str(d["_id"]))
-        texts.append(text)
-
-    if len(texts) == 0:
+    # only index active/new/updated or imported; filter metadata is refreshed for all of them
+    info = {
+        str(d["_id"]): d
+        for d in events_coll.find(
+            {"status": {"$ne": "inactive"}},
+            {"checksum": 1, "start_time": 1, "status": 1, "source_name": 1, "city": 1},
+        )
+    }
+    current = {mid: d.get("checksum") or "" for mid, d in info.items()}
+
+    state = None if full else _load_for_update()
+    if state is None:
+        ids, vectors = _embed_events(list(current), batch_size)
+        checksums = [current[m] for m in ids]
         if _HAVE_FAISS:
-            index = faiss.IndexFlatIP(EMBED_DIM)
-            faiss.write_index(index, INDEX_FILE)
+            # we will use normalized vectors and inner product for cosine similarity;
+            # the structure (flat / IVF / HNSW) comes from INDEX_TYPE and is trained on these vectors
+            index = make_index(vectors, EMBED_DIM)
+            if len(ids):
+                index.add_with_ids(vectors, np.arange(len(ids), dtype="int64"))
         else:
-            np.save(EMBEDDINGS_FILE, np.zeros((0, EMBED_DIM), dtype="float32"))
-        with open(MAPPING_FILE, "w") as f:
-            json.dump({"ids": []}, f)
-        return {"built": 0}
-
-    # embed in batches to limit memory
-    embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        emb = embed_texts(batch)
-        embeddings.append(emb)
-    embeddings = np.vstack(embeddings).astype("float32")
-
-    # we will use normalized vectors and inner product for cosine similarity (vectors normalized above)
+            index = _Embeddings.from_vectors(vectors)
+        _write_index(index, ids, checksums, info)
+        return {"built": len(ids), "mode": "full", "embedded": len(ids)}
+
+    index, mapping = state
+    ids, checksums = mapping["ids"], mapping["checksums"]
+    label_of = {mid: label for label, mid in enumerate(ids) if mid is not None}
+
+    removed = [label for mid, label in label_of.items() if mid not in current]
+    stale = [mid for mid, cs in current.items() if mid in label_of and checksums[label_of[mid]] != cs]
+    added = [mid for mid in current if mid not in label_of]
+
+    embedded_ids, vectors = _embed_events(stale + added, batch_size)
+    embedded = set(embedded_ids)
+    # changed events that disappeared before we could embed them are dropped too
+    removed += [label_of[mid] for mid in stale if mid not in embedded]
+
+    # HNSW can't remove vectors: changed events get a new label and the old one is tombstoned
+    removable = not _HAVE_FAISS or can_remove_from_index(index)
+    labels = []
+    for mid in embedded_ids:
+        label = label_of.get(mid)
+        if label is not None and not removable:
+            ids[label] = None
+            checksums[label] = None
+            label = None
+        if label is None:
+            label = len(ids)
+            ids.append(mid)
+            checksums.append(None)
+        checksums[label] = current[mid]
+        labels.append(label)
+    for label in removed:
+        ids[label] = None
+        checksums[label] = None
+
+    labels = np.array(labels, dtype="int64")
+    replaced = [label_of[mid] for mid in embedded_ids if mid in label_of]
     if _HAVE_FAISS:
-        index = faiss.IndexFlatIP(embeddings.shape[1])
-        index.add(embeddings)
-        faiss.write_index(index, INDEX_FILE)
+        to_remove = np.array(removed + replaced, dtype="int64")
+        if len(to_remove) and removable:
+            index.remove_ids(to_remove)
+        if len(labels):
+            index.add_with_ids(vectors, labels)
     else:
-        np.save(EMBEDDINGS_FILE, embeddings)
+        grow = len(ids) - index.shape[0]
+        if grow:
+            index.grow(grow)
+        if len(labels):
+            index.set(labels, vectors)
+        if removed:
+            # tombstones: zero vectors with no id, skipped at query time
+            index.clear(removed)
 
-    # write id mapping (row idx -> mongo id)
-    with open(MAPPING_FILE, "w") as f:
-        json.dump({"ids": ids}, f)
+    dead = ids.count(None)
+    compacted = False
+    if ids and dead / len(ids) > INDEX_COMPACT_RATIO:
+        index, ids, checksums = _compact(index, ids, checksums)
+        compacted = True
 
-    return {"built": len(ids)}
+    _write_index(index, ids, checksums, info)
+    return {
+        "built": sum(1 for mid in ids if mid is not None),
+        "mode": "incremental",
+        "embedded": len(embedded_ids),
+        "added": len([m for m in embedded_ids if m not in label_of]),
+        "updated": len(replaced),
+        "removed": len(removed),
+        "compacted": compacted,
+    }
 
-def load_index():
+def _atomic_write(path, write):
+    """Write via a temp file + rename so readers never see a half-written file."""
+    # unique per writer: concurrent writes of the same path (e.g. two workers caching one query)
+    # must not share a temp file; same directory so the rename stays atomic
+    tmp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def _save_npy(path, arr):
+    # np.save would append ".npy" to a bare path
+    with open(path, "wb") as f:
+        np.save(f, arr)
+
+def _save_npz(path, arrays):
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+def _save_json(path, obj):
+    with open(path, "w") as f:
+        json.dump(obj, f)
+
+def _read_metadata(mapping, ids):
+    if "vocab" not in mapping or not os.path.exists(METADATA_FILE):
+        # index built before filter metadata existed
+        return None
+    with np.load(METADATA_FILE) as npz:
+        meta = {name: npz[name] for name in npz.files}
+    if any(arr.shape[0] != len(ids) for arr in meta.values()):
+        return None
+    meta["vocab"] = mapping["vocab"]
+    meta["live"] = ids.any(axis=1)
+    return meta
+
+def _read_index():
+    """Returns (index_or_embeddings, ids, ntotal recorded in the mapping, filter metadata or None)."""
     if not os.path.exists(MAPPING_FILE):
-        return None, None
+        return None, None, None, None
     with open(MAPPING_FILE, "r") as f:
         mapping = json.load(f)
-    ids = mapping.get("ids", [])
+    ids = _read_ids(mapping)
+    meta = _read_metadata(mapping, ids)
 
     if _HAVE_FAISS and os.path.exists(INDEX_FILE):
-        index = faiss.read_index(INDEX_FILE)
-        return index, ids
+        index = tune_index(faiss.read_index(INDEX_FILE))
+        return index, ids, mapping.get("ntotal"), meta
 
     if os.path.exists(EMBEDDINGS_FILE):
-        embeddings = np.load(EMBEDDINGS_FILE)
-        return embeddings, ids
+        rows = np.load(EMBEDDINGS_FILE, mmap_mode="r" if INDEX_MMAP else None)
+        return _Embeddings(rows, mapping.get("scales")), ids, None, meta
+
+    return None, ids, None, None
+
+
+class _IndexHolder:
+    """
+    Process-wide copy of the index and id mapping.
+    Files are re-read only when their mtime/size change; the new state is swapped in as one tuple.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (version, index_or_embeddings, ids array, lazily built id lookup, filter metadata)
+        self._state = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def _version():
+        version = []
+        for path in (MAPPING_FILE, IDS_FILE, INDEX_FILE, EMBEDDINGS_FILE, METADATA_FILE):
+            try:
+                st = os.stat(path)
+                version.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+
+    def _current(self):
+        state = self._state
+        now = time.monotonic()
+        if state is not None and now - self._checked_at < INDEX_CHECK_INTERVAL:
+            return state
+
+        version = self._version()
+        if state is not None and state[0] == version:
+            self._checked_at = now
+            return state
+
+        with self._lock:
+            state = self._state
+            if state is None or state[0] != version:
+                index, ids, ntotal, meta = _read_index()
+                if state is None or _is_consistent(index, ids, ntotal):
+                    state = self._state = (version, index, ids, {}, meta)
+                # else: files are mid-rebuild (index and mapping disagree); keep serving the old state
+            self._checked_at = now
+        return state
 
-    return None, ids
+    def get(self):
+        state = self._current()
+        return state[1], state[2]
 
-def query_by_vector(vec, k=8):
+    @staticmethod
+    def _label_of(ids, lookup, mongo_id):
+        """Label of a hex mongo id, or None. The sorted ids are built on first use per loaded index."""
+        if ids is None:
+            return None
+        try:
+            key = bytes.fromhex(mongo_id)
+        except ValueError:
+            return None
+        if len(key) != 12:
+            return None
+        if "keys" not in lookup:
+            live = np.flatnonzero(ids.any(axis=1))
+            keys = np.ascontiguousarray(ids[live]).view("V12").ravel()
+            order = np.argsort(keys)
+            lookup["labels"] = live[order]
+            lookup["keys"] = keys[order]
+        keys = lookup["keys"]
+        pos = int(np.searchsorted(keys, np.void(key)))
+        if pos < len(keys) and keys[pos] == np.void(key):
+            return int(lookup["labels"][pos])
+        return None
+
+    def stored_vector(self, mongo_id):
+        """The indexed vector for an event, or None if it isn't in the index."""
+        _, index, ids, lookup, _ = self._current()
+        label = self._label_of(ids, lookup, mongo_id)
+        if index is None or label is None:
+            return None
+        if hasattr(index, "reconstruct"):
+            try:
+                return index.reconstruct(label)
+            except RuntimeError:
+                # index type without reconstruct support
+                return None
+        return index.vectors([label])[0]
+
+    def filter_mask(self, filters):
+        """
+        Boolean mask over labels for parsed filters (see parse_filters), or None when the
+        index has no filter metadata (older build).
+        """
+        _, _, ids, _, meta = self._current()
+        if meta is None:
+            return None
+        mask = meta["live"].copy()
+        vocab = meta["vocab"]
+        if filters.get("city"):
+            # same idea as the list endpoint's city filter: case-insensitive substring
+            needle = filters["city"].lower()
+            codes = [code for name, code in vocab["city"].items() if needle in name.lower()]
+            mask &= np.isin(meta["city"], codes)
+        if filters.get("status"):
+            code = vocab["status"].get(filters["status"])
+            if code is None:
+                return np.zeros_like(mask)
+            mask &= meta["status"] == code
+        if filters.get("from") is not None:
+            mask &= meta["start_time"] >= _to_epoch(filters["from"])
+        if filters.get("to") is not None:
+            mask &= (meta["start_time"] <= _to_epoch(filters["to"])) & (meta["start_time"] != NO_TIME)
+        return mask
+
+
+def _is_consistent(index, ids, ntotal=None):
+    """True if the index and id array (see _read_ids) come from the same build."""
+    n = 0 if ids is None else len(ids)
+    if index is None:
+        return not n
+    if hasattr(index, "ntotal"):
+        if ntotal is not None:
+            return index.ntotal == ntotal
+        # faiss drops removed rows; the id array keeps zeros in their place
+        return index.ntotal == (int(ids.any(axis=1).sum()) if n else 0)
+    return index.shape[0] == n
+
+
+_index_holder = _IndexHolder()
+
+def load_index():
+    """
+    Return (index_or_embeddings, ids) from the in-memory holder, reloading if the files changed.
+    ids is the (n, 12) uint8 array of raw ObjectIds by label (see _read_ids).
+    """
+    return _index_holder.get()
+
+def warm_up(encode=True):
+    """
+    Load the model and the index now instead of on the first request, and run one dummy encode
+    (first inference is slower). encode=False only loads the model, e.g. in a gunicorn master
+    before forking. Returns timings in seconds.
+    """
+    timings = {}
+    started = time.perf_counter()
+    get_model()
+    timings["model"] = time.perf_counter() - started
+    if encode:
+        t = time.perf_counter()
+        index, _ = load_index()
+        timings["index"] = time.perf_counter() - t
+        timings["index_loaded"] = index is not None
+        t = time.perf_counter()
+        # not cached, so the model really runs
+        embed_texts(["warm up"], use_cache=False)
+        timings["encode"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+def query_by_vector(vec, k=8, filters=None):
     """
     vec: numpy array shape (d,) or (1,d), must be normalized if index built with normalized vectors
+    filters: parsed filters (see parse_filters); matching rows are selected before scoring,
+    so a filtered query still returns k results in one pass
     returns list of tuples (mongo_id, score)
     """
+    return query_by_vectors(np.array(vec, dtype="float32").reshape(1, -1), k=k, filters=filters)[0]
+
+def query_by_vectors(vecs, k=8, filters=None):
+    """
+    Multi-query version of query_by_vector: vecs is (q, d), one index search (or one
+    matrix product in the numpy fallback) for all rows. Returns q lists of (mongo_id, score).
+    """
+    with instrumentation.SEARCH_SECONDS.time(filtered=bool(filters)):
+        return _search_vectors(vecs, k, filters)
+
+def _search_vectors(vecs, k, filters):
+    xq = np.ascontiguousarray(vecs, dtype="float32").reshape(-1, EMBED_DIM)
+    empty = [[] for _ in range(len(xq))]
     index_or_embeddings, ids = load_index()
-    if index_or_embeddings is None:
-        return []
+    if index_or_embeddings is None or len(xq) == 0:
+        return empty
 
-    xq = np.array(vec, dtype="float32").reshape(1, -1)
+    k = max(k, 1)
+    mask = _index_holder.filter_mask(filters) if filters else None
+    if mask is not None and not mask.any():
+        return empty
 
     if _HAVE_FAISS and hasattr(index_or_embeddings, "search"):
-        D, I = index_or_embeddings.search(xq, k)
+        index = index_or_embeddings
+        n_total = index.ntotal
+        if mask is not None:
+            selected = np.flatnonzero(mask)
+            if len(selected) <= FILTER_EXACT_MAX:
+                # few matches: exact scores over just those rows
+                vectors = index.reconstruct_batch(selected.astype("int64"))
+                return [_top_k(row, selected, ids, k) for row in (xq @ vectors.T).astype("float32")]
+            params, _keepalive = filtered_search_params(index, mask)
+            D, I = index.search(xq, min(k, len(selected)), params=params)
+            return [_with_ids(ids, i.tolist(), d.tolist()) for d, i in zip(D, I)]
+        def top(n):
+            return index.search(xq, n)
+    else:
+        embeddings = index_or_embeddings
+        n_total = embeddings.shape[0]
+        if n_total == 0:
+            return empty
+        # embeddings are already normalized; use dot-product for cosine similarity
+        scores = embeddings.scores(xq)
+        if mask is not None:
+            selected = np.flatnonzero(mask)
+            return [_top_k(row, selected, ids, k) for row in scores[:, selected]]
+        def top(n):
+            idxs = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+            part = np.take_along_axis(scores, idxs, axis=1)
+            order = np.argsort(-part, axis=1)
+            return np.take_along_axis(part, order, axis=1), np.take_along_axis(idxs, order, axis=1)
+
+    if n_total == 0:
+        return empty
+    topk = int(min(k, n_total))
+    while True:
+        D, I = top(topk)
         results = []
-        for score, idx in zip(D[0], I[0]):
-            if idx < 0 or idx >= len(ids):
-                continue
-            results.append((ids[idx], float(score)))
-        return results
-
-    embeddings = np.array(index_or_embeddings, dtype="float32")
-    if embeddings.size == 0:
-        return []
-    # embeddings are already normalized; use dot-product for cosine similarity
-    scores = (embeddings @ xq.reshape(-1)).astype("float32")
-    topk = int(min(max(k, 1), scores.shape[0]))
-    idxs = np.argpartition(-scores, topk - 1)[:topk]
-    idxs = idxs[np.argsort(-scores[idxs])]
-    results = []
-    for idx in idxs.tolist():
-        if idx < 0 or idx >= len(ids):
-            continue
-        results.append((ids[idx], float(scores[idx])))
-    return results
+        for d, i in zip(D.tolist(), I.tolist()):
+            # removed (tombstoned) rows are dropped
+            results.append(_with_ids(ids, i, d))
+        if topk == n_total or all(len(r) >= k for r in results):
+            return [r[:k] for r in results]
+        topk = int(min(topk * 2, n_total))
 
-def recommend_by_event(event_id, k=8):
-    # find event in mongo
-    doc = events_coll.find_one({"_id": __import__("bson").ObjectId(event_id)})
-    if not doc:
+def _top_k(scores, labels, ids, k):
+    """Top k (mongo_id, score) from scores for the given (already filtered) labels."""
+    n = min(k, len(scores))
+    if n == 0:
         return []
-    text = " | ".join([doc.get("title","") or "", doc.get("venue","") or "", doc.get("description","") or ""])
-    emb = embed_texts([text])[0]
-    return query_by_vector(emb, k=k)
+    order = np.argpartition(-scores, n - 1)[:n]
+    order = order[np.argsort(-scores[order])]
+    return _with_ids(ids, labels[order].tolist(), scores[order].tolist())
 
-def recommend_by_preferences(preferences_text, k=8):
+def parse_filters(city=None, start_from=None, start_to=None, status=None):
+    """
+    Same filters as the events list endpoint: city, from/to (ISO dates), status.
+    Returns None if none are set; raises ValueError for unparseable dates.
+    """
+    filters = {}
+    if city:
+        filters["city"] = city
+    if status:
+        filters["status"] = status
+    for key, value in (("from", start_from), ("to", start_to)):
+        if value:
+            # naive UTC, like start_time in Mongo
+            dt = to_datetime(value)
+            if dt is None:
+                raise ValueError(f"invalid {key} date: {value}")
+            filters[key] = dt
+    return filters or None
+
+def recommend_by_event(event_id, k=8, filters=None):
+    # the event's vector is usually already in the index
+    emb = _index_holder.stored_vector(str(event_id))
+    if emb is None:
+        # find event in mongo
+        doc = events_coll.find_one({"_id": __import__("bson").ObjectId(event_id)})
+        if not doc:
+            return []
+        emb = embed_texts([_event_text(doc)])[0]
+    return query_by_vector(emb, k=k, filters=filters)
+
+def recommend_by_preferences(preferences_text, k=8, filters=None):
     # preferences_text: string describing what user likes
     emb = embed_texts([preferences_text])[0]
-    return query_by_vector(emb, k=k)
+    return query_by_vector(emb, k=k, filters=filters)
 
-def fetch_events_with_scores(id_score_pairs):
+def fetch_events_with_scores(id_score_pairs, limit=None, filters=None):
     """
-    Convert list of (mongo_id_str, score) into serialized event docs
+    Convert list of (mongo_id_str, score) into serialized event docs, in score order.
+    One $in query; events that went inactive since the index was built are dropped,
+    as are events whose status no longer matches a status filter.
     """
+    docs = _live_docs([mid for mid, _ in id_score_pairs], filters)
+    return _with_scores(docs, id_score_pairs, limit)
+
+def _live_docs(mongo_ids, filters=None):
+    """{mongo_id: doc} for the ids that are still live (and match a status filter), one $in query."""
+    from bson.objectid import ObjectId
+
+    oids = []
+    for mid in set(mongo_ids):
+        try:
+            oids.append(ObjectId(mid))
+        except Exception:
+            continue
+    if not oids:
+        return {}
+    query = {"_id": {"$in": oids}, "status": {"$ne": "inactive"}}
+    if filters and filters.get("status"):
+        query["status"] = filters["status"]
+    return {str(d["_id"]): d for d in events_coll.find(query, EVENT_LIST_PROJECTION)}
+
+def _with_scores(docs, id_score_pairs, limit=None):
     res = []
     for mid, score in id_score_pairs:
+        doc = docs.get(mid)
+        if doc:
+            d = serialize_event(doc)
+            d["score"] = score
+            res.append(d)
+            if limit is not None and len(res) >= limit:
+                break
+    return res
+
+def live_recommendations(search, k, filters=None):
+    """
+    search(n) -> [(mongo_id, score)]. Over-fetches from the index so that k live events
+    come back even if some indexed ones went inactive; widens until the index runs out.
+    """
+    want = max(k, 1) * RECOMMEND_OVERFETCH
+    while True:
+        pairs = search(want)
+        results = fetch_events_with_scores(pairs, limit=k, filters=filters)
+        if len(results) >= k or len(pairs) < want:
+            return results
+        want *= 2
+
+def _event_vectors(event_ids):
+    """
+    Query vectors for event ids: stored index vectors where possible, the rest embedded in one batch.
+    Returns (vectors, found) where found[i] is False for unknown/invalid ids (their row is zeros).
+    """
+    from bson.objectid import ObjectId
+
+    vectors = np.zeros((len(event_ids), EMBED_DIM), dtype="float32")
+    found = [False] * len(event_ids)
+    missing = {}
+    for i, event_id in enumerate(event_ids):
+        emb = _index_holder.stored_vector(str(event_id))
+        if emb is not None:
+            vectors[i] = emb
+            found[i] = True
+            continue
         try:
-            from bson.objectid import ObjectId
-            doc = events_coll.find_one({"_id": ObjectId(mid)})
-            if doc:
-                d = serialize_event(doc)
-                d["score"] = score
-                res.append(d)
+            missing.setdefault(ObjectId(event_id), []).append(i)
         except Exception:
             continue
-    return res
+    if missing:
+        docs = list(events_coll.find({"_id": {"$in": list(missing)}}))
+        if docs:
+            embs = embed_texts([_event_text(doc) for doc in docs])
+            for doc, emb in zip(docs, embs):
+                for i in missing[doc["_id"]]:
+                    vectors[i] = emb
+                    found[i] = True
+    return vectors, found
+
+def recommend_batch(typ, keys, k=8, filters=None):
+    """
+    Recommendations for many event ids (typ "by_event") or preference texts (typ "by_user").
+    Yields (key, results) in input order, RECOMMEND_BATCH_SIZE keys at a time: per chunk one
+    batched encode, one multi-query index search and one $in hydration, so results can be
+    streamed while later chunks are still being computed.
+    results is None for event ids that don't exist.
+    """
+    k = max(k, 1)
+    for start in range(0, len(keys), RECOMMEND_BATCH_SIZE):
+        chunk = keys[start:start + RECOMMEND_BATCH_SIZE]
+        if typ == "by_event":
+            vectors, found = _event_vectors(chunk)
+        else:
+            vectors, found = embed_texts(chunk), [True] * len(chunk)
+
+        results = [None] * len(chunk)
+        pending = [i for i in range(len(chunk)) if found[i]]
+        want = k * RECOMMEND_OVERFETCH
+        # same widening as live_recommendations, but only for the queries still short of k
+        while pending:
+            pairs = query_by_vectors(vectors[pending], k=want, filters=filters)
+            docs = _live_docs([mid for p in pairs for mid, _ in p], filters)
+            still_short = []
+            for i, p in zip(pending, pairs):
+                results[i] = _with_scores(docs, p, limit=k)
+                if len(results[i]) < k and len(p) >= want:
+                    still_short.append(i)
+            pending = still_short
+            want *= 2
+
+        for key, res in zip(chunk, results):
+            yield key, res
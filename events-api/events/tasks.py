@@ -1,71 +1,148 @@
 # events/tasks.py
-from celery import shared_task
+from celery import chord, shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
 from datetime import datetime, timedelta
-from dateutil import parser as dateparser
-from .mongo import events_coll
+from pymongo.errors import PyMongoError
+from .cache import bump_generation
+from .mongo import events_coll, scrape_runs_coll
 import traceback
 import sys
+import time
 from pathlib import Path
 
-from .recommender import build_index
+from .recommender import build_index, parse_filters, recommend_batch
 
 
-def _import_run_once():
-	"""Import scraper.main.run_once, even if event-scraper isn't installed."""
+def _import_scraper_main():
+	"""Import scraper.main, even if event-scraper isn't installed."""
 	try:
-		from scraper.main import run_once  # type: ignore
-		return run_once
+		import scraper.main  # type: ignore
 	except ModuleNotFoundError:
 		repo_root = Path(__file__).resolve().parents[2]
 		event_scraper_root = repo_root / "event-scraper"
 		if str(event_scraper_root) not in sys.path:
 			sys.path.insert(0, str(event_scraper_root))
-		from scraper.main import run_once  # type: ignore
-		return run_once
+		import scraper.main  # type: ignore
+	return scraper.main
+
+
+def _import_run_once():
+	"""Import scraper.main.run_once, even if event-scraper isn't installed."""
+	return _import_scraper_main().run_once
+
+
+def _record_scrape_run(stats, mode, started_at):
+	"""Store one run's summary (without per-url latencies) in scrape_runs."""
+	finished_at = datetime.utcnow()
+	doc = {k: v for k, v in stats.items() if k != "fetch_latencies"}
+	doc.update({
+		"mode": mode,
+		"started_at": started_at,
+		"finished_at": finished_at,
+		"duration": round((finished_at - started_at).total_seconds(), 3),
+	})
+	doc.setdefault("status", "error" if doc.get("failed_sources") else "ok")
+	try:
+		scrape_runs_coll.insert_one(doc)
+	except PyMongoError as e:
+		print("Could not record scrape run:", e)
 
 
 @shared_task
-def run_scraper_task():
+def run_scraper_task(fanout=None):
 	"""
 	Call the scraper.main.run_once() function (from your scraper package).
 	This runs the scraper and upserts events into Mongo.
+	With fanout (default: SCRAPER_FANOUT setting) each source runs as its own scrape_source_task
+	(a chord), and merge_scrape_results_task combines their stats.
 	"""
 	try:
+		if fanout is None:
+			fanout = settings.SCRAPER_FANOUT
+		if fanout:
+			scraper_main = _import_scraper_main()
+			header = []
+			for src in scraper_main.SOURCES:
+				timeout = src.get("timeout", scraper_main.SOURCE_TIMEOUT)
+				# soft limit lets the task report the timeout; the hard one kills it
+				header.append(scrape_source_task.s(src["name"]).set(soft_time_limit=timeout, time_limit=timeout + 30))
+			result = chord(header)(merge_scrape_results_task.s(started_at=time.time()))
+			return {"status": "dispatched", "sources": len(header), "merge_task_id": result.id}
 		# import inside task to avoid import-time side-effects
 		run_once = _import_run_once()
+		started_at = datetime.utcnow()
 		result = run_once()  # returns stats dict from scraper
+		_record_scrape_run(result, "inline", started_at)
 		return {"status": "ok", "result": result}
 	except Exception as e:
 		return {"status": "error", "error": str(e), "trace": traceback.format_exc()}
 
 
 @shared_task
-def mark_inactive_task(days_threshold=7):
+def scrape_source_task(name):
+	"""Scrape one source; always returns its stats (status "error" on failure) so the chord completes."""
+	try:
+		return {"name": name, **_import_scraper_main().scrape_source(name)}
+	except SoftTimeLimitExceeded:
+		return {"name": name, "status": "error", "error": "timed out"}
+	except Exception as e:
+		return {"name": name, "status": "error", "error": str(e)}
+
+
+@shared_task
+def merge_scrape_results_task(results, started_at=None):
+	"""
+	Chord callback: one summary (same shape as run_once's) from the per-source results,
+	also stored in scrape_runs. started_at is the run's start (epoch seconds).
+	"""
+	try:
+		stats = _import_scraper_main().merge_source_stats({res["name"]: res for res in results})
+		print("Done. stats:", stats)
+		started = datetime.utcfromtimestamp(started_at) if started_at else datetime.utcnow()
+		_record_scrape_run(stats, "fanout", started)
+		return {"status": "ok", "result": stats}
+	except Exception as e:
+		return {"status": "error", "error": str(e), "trace": traceback.format_exc()}
+
+
+@shared_task
+def mark_inactive_task(days_threshold=7, dry_run=False):
 	"""
 	Mark events as inactive if last_scraped_at is older than days_threshold.
 	Does NOT overwrite events with status 'imported'.
+	One update_many on the server (last_scraped_at is a BSON date; see `manage.py migrate_datetimes`).
+	dry_run only counts the events that would be marked.
 	"""
 	try:
-		now = datetime.utcnow()
-		cutoff = now - timedelta(days=int(days_threshold))
-		updated = 0
-		cursor = events_coll.find({"status": {"$ne": "imported"}})
-		for doc in cursor:
-			last = doc.get("last_scraped_at")
-			if not last:
-				continue
-			try:
-				dt = dateparser.parse(last)
-			except Exception:
-				continue
-			if dt < cutoff:
-				events_coll.update_one({"_id": doc["_id"]}, {"$set": {"status": "inactive"}})
-				updated += 1
+		cutoff = datetime.utcnow() - timedelta(days=int(days_threshold))
+		query = {
+			"status": {"$nin": ["imported", "inactive"]},
+			"last_scraped_at": {"$lt": cutoff},
+		}
+		if dry_run:
+			return {"status": "ok", "dry_run": True, "would_update": events_coll.count_documents(query)}
+		updated = events_coll.update_many(query, {"$set": {"status": "inactive"}}).modified_count
+		if updated:
+			bump_generation()
 		return {"status": "ok", "updated": updated}
 	except Exception as e:
 		return {"status": "error", "error": str(e), "trace": traceback.format_exc()}
 
 
 @shared_task
-def rebuild_faiss_index():
-	return build_index()
+def rebuild_faiss_index(full=False):
+	"""Update the index with new/changed events; full=True forces a complete rebuild."""
+	return build_index(full=full)
+
+
+@shared_task
+def recommend_batch_task(typ, keys, k=8, filters=None):
+	"""
+	Batch recommendations (e.g. for digest emails): typ is "by_event" or "by_user", keys the
+	event ids / preference texts. filters is {city, from, to, status} with ISO date strings.
+	Returns [{key, results}] in input order; results is None for unknown events.
+	"""
+	filters = filters or {}
+	parsed = parse_filters(filters.get("city"), filters.get("from"), filters.get("to"), filters.get("status"))
+	return [{"key": key, "results": results} for key, results in recommend_batch(typ, keys, k=k, filters=parsed)]
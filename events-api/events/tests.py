@@ -0,0 +1,60 @@
+"""
+Run with: python manage.py test events.tests  (needs mongomock: pip install mongomock)
+"""
+import unittest
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory
+
+from .pagination import MongoPagination
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+@unittest.skipUnless(mongomock, "mongomock not installed")
+class MongoPaginationTests(SimpleTestCase):
+    def setUp(self):
+        self.coll = mongomock.MongoClient().db.events
+        start = datetime(2025, 1, 1)
+        # a few share a start_time, one has none, to exercise the (start_time, _id) tie-break
+        self.coll.insert_many(
+            [{"title": f"e{i}", "start_time": start + timedelta(days=i // 2)} for i in range(9)]
+            + [{"title": "undated", "start_time": None}]
+        )
+        self.factory = APIRequestFactory()
+
+    def _get(self, url):
+        paginator = MongoPagination()
+        docs = paginator.paginate(self.coll, {}, self.factory.get(url), projection={"title": 1})
+        return [d["title"] for d in docs], paginator.get_paginated_response([]).data
+
+    def test_first_page_next_switches_to_cursor(self):
+        titles, data = self._get("/api/events/?page_size=4")
+        self.assertEqual(data["count"], 10)
+        self.assertIn("cursor", parse_qs(urlsplit(data["next"]).query))
+
+        seen = list(titles)
+        url = data["next"]
+        while url:
+            page, data = self._get(url)
+            self.assertNotIn("page", parse_qs(urlsplit(url).query))
+            seen.extend(page)
+            url = data["next"]
+        expected = [d["title"] for d in self.coll.find().sort(MongoPagination.sort)]
+        self.assertEqual(seen, expected)
+
+    def test_empty_cursor_starts_keyset(self):
+        titles, data = self._get("/api/events/?page_size=4&cursor=")
+        self.assertEqual(titles, self._get("/api/events/?page_size=4")[0])
+        self.assertIn("cursor", parse_qs(urlsplit(data["next"]).query))
+
+    def test_page_numbers_still_work(self):
+        titles, data = self._get("/api/events/?page_size=4&page=2")
+        self.assertEqual(len(titles), 4)
+        self.assertEqual(parse_qs(urlsplit(data["next"]).query)["page"], ["3"])
+        self.assertIsNotNone(data["previous"])
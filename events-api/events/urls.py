@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import EventListView, EventDetailView, SubscriptionView, AdminImportView
-from .api_recommend import RecommendationView
+from .api_recommend import RecommendationView, RecommendationBatchView
 
 urlpatterns = [
     path("events/", EventListView.as_view(), name="events-list"),
@@ -8,4 +8,5 @@ urlpatterns = [
     path("subscriptions/", SubscriptionView.as_view(), name="subscriptions"),
     path("admin/import/<str:event_id>/", AdminImportView.as_view(), name="admin-import"),
     path("recommendations/", RecommendationView.as_view(), name="recommendations"),
+    path("recommendations/batch/", RecommendationBatchView.as_view(), name="recommendations-batch"),
 ]
@@ -0,0 +1,129 @@
+"""
+FAISS index factory used by the recommender (and scripts/bench_index.py).
+
+INDEX_TYPE selects the structure:
+- flat: exact inner-product scan (IndexIDMap2 over IndexFlatIP)
+- ivf_flat: inverted lists over k-means cells, full vectors
+- ivf_pq: inverted lists with product-quantized vectors (smallest memory)
+- hnsw: graph index (IndexIDMap2 over IndexHNSWFlat); vectors can't be removed, only tombstoned
+Kept free of Django/Mongo imports so it can be benchmarked standalone.
+"""
+import math
+import os
+
+import numpy as np
+
+try:
+    import faiss  # type: ignore
+    _HAVE_FAISS = True
+except Exception:
+    faiss = None
+    _HAVE_FAISS = False
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+INDEX_TYPE = os.environ.get("INDEX_TYPE", "flat")
+# 0 -> about 4*sqrt(n) lists
+IVF_NLIST = int(os.environ.get("INDEX_IVF_NLIST", "0"))
+IVF_NPROBE = int(os.environ.get("INDEX_IVF_NPROBE", "16"))
+PQ_M = int(os.environ.get("INDEX_PQ_M", "48"))  # sub-quantizers; must divide the dimension
+HNSW_M = int(os.environ.get("INDEX_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("INDEX_HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.environ.get("INDEX_HNSW_EF_SEARCH", "64"))
+
+# k-means wants ~39 training points per list; below this IVF falls back to flat
+_MIN_POINTS_PER_LIST = 39
+
+
+def _nlist_for(n):
+    nlist = IVF_NLIST or int(4 * math.sqrt(max(n, 1)))
+    return max(1, min(nlist, n // _MIN_POINTS_PER_LIST))
+
+
+def effective_type(n, index_type=None):
+    """The index type actually built for n vectors (small catalogs can't train IVF)."""
+    index_type = index_type or INDEX_TYPE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"INDEX_TYPE must be one of {', '.join(INDEX_TYPES)}")
+    if index_type == "ivf_pq" and n < 256 * _MIN_POINTS_PER_LIST:
+        # not enough points to train 8-bit PQ codebooks
+        index_type = "ivf_flat"
+    if index_type == "ivf_flat" and n < _MIN_POINTS_PER_LIST * 2:
+        return "flat"
+    return index_type
+
+
+def make_index(train_vectors, dim, index_type=None):
+    """
+    Create an empty index of the configured type, trained on train_vectors.
+    Vectors are added with add_with_ids(vectors, labels).
+    """
+    index_type = effective_type(len(train_vectors), index_type)
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+    if index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, HNSW_M, metric)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        hnsw.hnsw.efSearch = HNSW_EF_SEARCH
+        return faiss.IndexIDMap2(hnsw)
+
+    nlist = _nlist_for(len(train_vectors))
+    quantizer = faiss.IndexFlatIP(dim)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, 8, metric)
+    index.train(np.ascontiguousarray(train_vectors, dtype="float32"))
+    # IVF indexes take labels natively; the hashtable direct map allows remove_ids + reconstruct by label
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    tune_index(index)
+    return index
+
+
+def tune_index(index):
+    """Apply query-time parameters (nprobe / efSearch) to a built or freshly loaded index."""
+    ps = faiss.ParameterSpace()
+    for name, value in (("nprobe", IVF_NPROBE), ("efSearch", HNSW_EF_SEARCH)):
+        try:
+            ps.set_index_parameter(index, name, value)
+        except RuntimeError:
+            # parameter doesn't apply to this index type
+            continue
+    return index
+
+
+def can_remove(index):
+    """HNSW graphs can't drop vectors; removed events stay as tombstoned labels."""
+    inner = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    return not isinstance(inner, faiss.IndexHNSW)
+
+
+def describe(index):
+    """Short type name for an index built by make_index()."""
+    inner = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def filtered_search_params(index, mask):
+    """
+    Search parameters restricting results to labels where mask is True (labels are row positions).
+    Returns (params, keepalive); keep the second value referenced until the search is done.
+    """
+    bitmap = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+    sel = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+    kind = describe(index)
+    if kind in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=IVF_NPROBE)
+    elif kind == "hnsw":
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=HNSW_EF_SEARCH)
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    return params, (bitmap, sel)
@@ -1,3 +1,5 @@
+import re
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
@@ -5,7 +7,10 @@ from django.conf import settings
 from django.utils import timezone
 from bson.objectid import ObjectId
 from pymongo.errors import PyMongoError
-from .mongo import events_coll, subscriptions_coll, serialize_event
+from .cache import bump_generation, cached_get
+from .dates import to_datetime
+from .mongo import events_coll, subscriptions_coll, serialize_event, EVENT_LIST_PROJECTION
+from .pagination import MongoPagination
 from .serializers import SubscriptionSerializer
 from datetime import datetime
 
@@ -20,8 +25,10 @@ def require_admin_token(request):
 class EventListView(APIView):
     """
     GET /api/events/?q=music&city=sydney&status=new&page=1
+    GET /api/events/?cursor=<next cursor>  (keyset pagination)
     """
     permission_classes = [permissions.AllowAny]
+    @cached_get
     def get(self, request):
         q = request.GET.get("q")
         city = request.GET.get("city")
@@ -31,49 +38,49 @@ class EventListView(APIView):
 
         query = {}
         if q:
-            # simple text search on title + description
-            query["$or"] = [
-                {"title": {"$regex": q, "$options": "i"}},
-                {"description": {"$regex": q, "$options": "i"}},
-            ]
+            # full-text search over the events_text index (title, venue, city, description)
+            query["$text"] = {"$search": q}
         if city:
-            city_or = [
-                {"city": {"$regex": city, "$options": "i"}},
-                {"venue": {"$regex": city, "$options": "i"}},
+            # user input is matched literally, not as a regex
+            city_re = re.escape(city)
+            query["$or"] = [
+                {"city": {"$regex": city_re, "$options": "i"}},
+                {"venue": {"$regex": city_re, "$options": "i"}},
             ]
-            if "$or" in query:
-                q_or = query.pop("$or")
-                query.setdefault("$and", []).extend([{"$or": q_or}, {"$or": city_or}])
-            else:
-                query["$or"] = city_or
         if status_filter:
             query["status"] = status_filter
         if start_from or start_to:
+            # start_time is a BSON date; compare against parsed datetimes, not raw strings
             time_q = {}
-            if start_from:
-                time_q["$gte"] = start_from
-            if start_to:
-                time_q["$lte"] = start_to
-            if time_q:
-                query["start_time"] = time_q
-
-        # pagination via DRF paginator
-        from rest_framework.pagination import PageNumberPagination
-        paginator = PageNumberPagination()
-        paginator.page_size = request.GET.get("page_size") or 12
-
+            for op, value in (("$gte", start_from), ("$lte", start_to)):
+                if not value:
+                    continue
+                parsed = to_datetime(value)
+                if parsed is None:
+                    return Response({"detail": "from/to must be ISO dates"}, status=status.HTTP_400_BAD_REQUEST)
+                time_q[op] = parsed
+            query["start_time"] = time_q
+
+        # ?fields=full returns whole documents instead of the list projection
+        projection = None if request.GET.get("fields") == "full" else EVENT_LIST_PROJECTION
+
+        # skip/limit (or keyset ?cursor=) run inside Mongo; only one page is read
+        paginator = MongoPagination()
+        if q:
+            # search results are ranked by relevance
+            paginator.sort = [("score", {"$meta": "textScore"}), ("_id", 1)]
+            paginator.keyset = False
+            projection = dict(projection or {}, score={"$meta": "textScore"})
         try:
-            cursor = events_coll.find(query).sort("start_time", 1)
-            # convert cursor to list then paginate
-            items = [serialize_event(d) for d in cursor]
+            docs = paginator.paginate(events_coll, query, request, projection=projection)
         except PyMongoError:
             return mongo_unavailable()
-        page = paginator.paginate_queryset(items, request)
-        return paginator.get_paginated_response(page)
+        return paginator.get_paginated_response([serialize_event(d) for d in docs])
 
 
 class EventDetailView(APIView):
     permission_classes = [permissions.AllowAny]
+    @cached_get
     def get(self, request, event_id):
         try:
             doc = events_coll.find_one({"_id": ObjectId(event_id)})
@@ -105,7 +112,7 @@ class SubscriptionView(APIView):
             "event_id": event_id,
             "email": data["email"],
             "consent": data["consent"],
-            "created_at": datetime.utcnow().isoformat() + "Z"
+            "created_at": datetime.utcnow()
         }
         try:
             subscriptions_coll.insert_one(doc)
@@ -128,7 +135,7 @@ class AdminImportView(APIView):
             return Response({"detail":"Invalid id"}, status=status.HTTP_400_BAD_REQUEST)
 
         user = request.headers.get("X-User-Email", "admin")  # optional header indicating who did import
-        now = datetime.utcnow().isoformat() + "Z"
+        now = datetime.utcnow()
 
         notes = None
         try:
@@ -150,4 +157,5 @@ class AdminImportView(APIView):
             return mongo_unavailable()
         if res.matched_count == 0:
             return Response({"detail":"Not found"}, status=status.HTTP_404_NOT_FOUND)
+        bump_generation()
         return Response({"status":"imported"})
@@ -12,6 +12,8 @@ app.autodiscover_tasks()
 app.conf.beat_schedule = getattr(app.conf, "beat_schedule", {})
 app.conf.beat_schedule.update(
 	{
+		# the scraper fetches listings every run but only the detail pages that are due
+		# (event-scraper/scraper/schedule.py), so this is the finest revisit granularity
 		"scrape-events-every-30-min": {
 			"task": "events.tasks.run_scraper_task",
 			"schedule": 30 * 60.0,
@@ -52,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so the timing covers the other middleware too
+    "events.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -142,11 +144,45 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Mongo connection settings (used by our code)
 MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB = os.environ.get("MONGO_DB", "events_db")
+# Create missing Mongo indexes when the app starts (see events/indexes.py)
+MONGO_ENSURE_INDEXES = os.environ.get("MONGO_ENSURE_INDEXES", "1") == "1"
+
+# Load the recommender model + index when a server process starts instead of on the first request
+RECOMMENDER_WARMUP = os.environ.get("RECOMMENDER_WARMUP", "0") == "1"
+# gunicorn only: load the model once in the master so workers share it copy-on-write (see gunicorn.conf.py)
+RECOMMENDER_PRELOAD_MODEL = os.environ.get("RECOMMENDER_PRELOAD_MODEL", "0") == "1"
 
 # celery / redis settings
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", REDIS_URL)
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", REDIS_URL)
+# run_scraper_task fans out one Celery task per scraper source (needs the result backend for the chord)
+SCRAPER_FANOUT = os.environ.get("SCRAPER_FANOUT", "1") == "1"
+
+# Response cache for the event list/detail endpoints (see events/cache.py)
+# locmem: per process; redis: shared by all workers (uses REDIS_URL, or RESPONSE_CACHE_REDIS_URL)
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "locmem")
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "1800"))
+# Cache-Control max-age sent to browsers / CDNs
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get("RESPONSE_CACHE_MAX_AGE", "60"))
+# How often (seconds) a process re-reads the invalidation counter from Mongo
+RESPONSE_CACHE_GENERATION_CHECK = float(os.environ.get("RESPONSE_CACHE_GENERATION_CHECK", "2"))
+
+if RESPONSE_CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("RESPONSE_CACHE_REDIS_URL", REDIS_URL),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 2000},
+        }
+    }
 
 # Admin simple API token guard (for now)
 ADMIN_API_TOKEN = os.environ.get("ADMIN_API_TOKEN", "change-me")
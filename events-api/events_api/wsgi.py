@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'events_api.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.RECOMMENDER_PRELOAD_MODEL:
+    # gunicorn master with preload_app: model only, the rest happens after fork (gunicorn.conf.py)
+    from events.apps import warm_up_recommender
+
+    warm_up_recommender(encode=False)
+elif settings.RECOMMENDER_WARMUP:
+    from events.apps import warm_up_recommender
+
+    warm_up_recommender()
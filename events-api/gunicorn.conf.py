@@ -0,0 +1,14 @@
+# Picked up automatically by gunicorn when started from events-api/ (Render, Dockerfile).
+import os
+
+# Import the app (and, via events_api/wsgi.py, the recommender model) in the master before forking,
+# so workers share the model's memory pages copy-on-write.
+preload_app = os.environ.get("RECOMMENDER_PRELOAD_MODEL", "0") == "1"
+
+
+def post_fork(server, worker):
+    # Without preload_app each worker imports the app itself and warms up in events_api/wsgi.py.
+    if preload_app and os.environ.get("RECOMMENDER_WARMUP", "0") == "1":
+        from events.apps import warm_up_recommender
+
+        warm_up_recommender()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import sys
+import time
+
+# Event-like sample texts, used when --from-db is not given
+SAMPLE_TEXTS = [
+    "Sydney Festival opening night. Live music and light installations at Barangaroo Reserve.",
+    "Comedy night at the Enmore Theatre with local and touring stand-up acts.",
+    "Farmers market in Carriageworks, Eveleigh. Fresh produce, coffee and street food every Saturday.",
+    "Jazz in the Domain: free outdoor concert, bring a picnic.",
+    "Vivid Sydney light walk around Circular Quay and The Rocks.",
+    "Beginner pottery workshop in Marrickville, all materials included.",
+    "NRL grand final screening at a Parramatta pub, free entry.",
+    "Art exhibition opening at the Museum of Contemporary Art, Circular Quay.",
+    "Techno all-nighter in an Alexandria warehouse, 18+ only.",
+    "Family science day at the Powerhouse Museum with hands-on experiments.",
+    "Bondi to Coogee coastal walk meetup, free.",
+    "Indie rock gig at the Oxford Art Factory, Darlinghurst.",
+    "Wine tasting evening in the Hunter Valley with bus from Central.",
+    "Outdoor cinema at Centennial Park: classic films under the stars.",
+    "Startup networking drinks in Surry Hills.",
+    "Chinese New Year lantern festival, Darling Harbour.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends: cosine parity against fp32 torch and encode throughput (sentences/sec)."
+    )
+    parser.add_argument("--backends", default="torch,torch-int8,onnx,onnx-int8", help="Comma-separated EMBED_BACKEND values")
+    parser.add_argument("--from-db", type=int, default=0, help="Use this many event texts from Mongo instead of the samples")
+    parser.add_argument("--repeat", type=int, default=8, help="Repeat the sample texts to get a larger set")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Fail if any vector is further than this from torch")
+    args = parser.parse_args()
+
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "events_api.settings")
+    import django
+
+    django.setup()
+    import numpy as np
+    from events.recommender import _event_text, events_coll, load_model
+
+    if args.from_db:
+        texts = [_event_text(doc) for doc in events_coll.find({}).limit(args.from_db)]
+    else:
+        # suffix keeps repeats distinct
+        texts = [f"{text} ({i})" for i in range(args.repeat) for text in SAMPLE_TEXTS]
+    if not texts:
+        print("no texts to encode")
+        return 1
+
+    def encode(model, batch, batch_size):
+        return model.encode(
+            batch, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True
+        )
+
+    reference = encode(load_model("torch"), texts, args.batch_size)
+    failed = False
+    print(f"{len(texts)} texts")
+    print(f"{'backend':>11} {'load s':>7} {'min cos':>8} {'mean cos':>9} {'single/s':>9} {'batch/s':>9}")
+    for backend in args.backends.split(","):
+        started = time.perf_counter()
+        try:
+            model = load_model(backend)
+        except Exception as e:
+            print(f"{backend:>11} unavailable: {e}")
+            continue
+        load_s = time.perf_counter() - started
+        # first call initializes kernels/sessions; keep it out of the timings
+        encode(model, texts[:2], args.batch_size)
+
+        started = time.perf_counter()
+        vectors = encode(model, texts, args.batch_size)
+        batch_rate = len(texts) / (time.perf_counter() - started)
+
+        single = texts[: min(len(texts), 64)]
+        started = time.perf_counter()
+        for text in single:
+            encode(model, [text], 1)
+        single_rate = len(single) / (time.perf_counter() - started)
+
+        # both sides are normalized, so the row-wise dot product is the cosine
+        cos = np.sum(np.asarray(vectors, dtype="float32") * reference, axis=1)
+        if cos.min() < args.min_cosine:
+            failed = True
+        print(
+            f"{backend:>11} {load_s:>7.2f} {cos.min():>8.4f} {cos.mean():>9.4f} "
+            f"{single_rate:>9.1f} {batch_rate:>9.1f}{'  FAIL' if cos.min() < args.min_cosine else ''}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
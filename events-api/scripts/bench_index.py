@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import time
+
+
+def synthetic_embeddings(n, dim, rng, n_clusters=256, noise=0.35):
+    """Normalized vectors drawn around random centers (closer to real sentence embeddings than pure noise)."""
+    import numpy as np
+
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    out = np.empty((n, dim), dtype="float32")
+    step = 100_000
+    for i in range(0, n, step):
+        m = min(step, n - i)
+        assign = rng.integers(0, n_clusters, size=m)
+        chunk = centers[assign] + noise * rng.standard_normal((m, dim)).astype("float32")
+        chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+        out[i:i + m] = chunk
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark recommender index types: recall@k vs flat, query latency, memory, build time."
+    )
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated catalog sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--types", default="flat,ivf_flat,ivf_pq,hnsw", help="Comma-separated INDEX_TYPE values")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    import numpy as np
+    from events.vector_index import _HAVE_FAISS, effective_type, faiss, make_index
+
+    if not _HAVE_FAISS:
+        print("faiss is not installed (pip install faiss-cpu)")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'n':>9} {'type':>9} {'built':>9} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8} {'MB':>8} {'build s':>8}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        xb = synthetic_embeddings(n, args.dim, rng)
+        # queries: perturbed catalog vectors
+        xq = xb[rng.integers(0, n, size=args.queries)] + 0.1 * rng.standard_normal((args.queries, args.dim)).astype("float32")
+        xq /= np.linalg.norm(xq, axis=1, keepdims=True)
+
+        exact = faiss.IndexFlatIP(args.dim)
+        exact.add(xb)
+        _, truth = exact.search(xq, args.k)
+        del exact
+
+        for index_type in args.types.split(","):
+            started = time.perf_counter()
+            index = make_index(xb, args.dim, index_type)
+            index.add_with_ids(xb, np.arange(n, dtype="int64"))
+            build_s = time.perf_counter() - started
+
+            _, found = index.search(xq, args.k)
+            recall = np.mean([len(set(found[i]) & set(truth[i])) / args.k for i in range(args.queries)])
+
+            latencies = []
+            for i in range(args.queries):
+                t0 = time.perf_counter()
+                index.search(xq[i:i + 1], args.k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            mb = faiss.serialize_index(index).nbytes / 1e6
+
+            print(
+                f"{n:>9} {index_type:>9} {effective_type(n, index_type):>9} {recall:>10.3f} "
+                f"{p50:>8.3f} {p99:>8.3f} {mb:>8.1f} {build_s:>8.2f}"
+            )
+            del index
+
+
+if __name__ == "__main__":
+    main()
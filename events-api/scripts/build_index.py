@@ -1,8 +1,17 @@
+import argparse
 import os
 import sys
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Build or update the recommendations index.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-embed every event instead of only new/changed ones.",
+    )
+    args = parser.parse_args()
+
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
@@ -13,7 +22,7 @@ def main():
     django.setup()
     from events.recommender import build_index
 
-    result = build_index()
+    result = build_index(full=args.full)
     print(result)
 
 
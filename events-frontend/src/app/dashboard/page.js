@@ -46,6 +46,8 @@ export default function DashboardPage() {
     const params = new URLSearchParams();
     params.set("page", "1");
     params.set("page_size", "50");
+    // the detail panel shows the full description
+    params.set("fields", "full");
 
     if (city?.trim()) params.set("city", city.trim());
     if (q?.trim()) params.set("q", q.trim());